@@ -2,59 +2,144 @@
 import os
 import json
 import time
-import re
+import asyncio
+import copy
 from dotenv import load_dotenv
-from retriever import retriever
-from scraper import scrape_url
-from prompts import RAG_PROMPT, ACCOUNT_PLAN_SCHEMA
-from openai import OpenAI
+from retriever import retriever, namespace_key
+from scraper import scrape_many_async
+from crawler import Crawler, CRAWL_MAX_PAGES, canonical_url
+from prompts import (RAG_PROMPT, ACCOUNT_PLAN_SCHEMA, SECTION_GROUPS, SECTION_PROMPT, EDIT_PATCH_PROMPT,
+                     PERSONA_PATCH_PROMPT, PERSONA_TONES)
+from plan_edits import dependents_of, apply_json_patch
+from plan_parser import IncrementalPlanParser, parse_json, parse_plan, validate_plan
+from intent_classifier import classify
+from company_resolver import company_resolver, seed_urls
+from competitor_graph import competitor_graph, competitor_url
+from conflict_detector import TOPIC_TERMS, detect_conflicts
+from llm_cache import llm_cache, make_key, cached_response
+from singleflight import SingleFlight
+from session_store import create_session_store
+from context_builder import build_context, count_tokens
+from warm_cache import WarmCache
+from rate_limiter import get_limiter, current_priority, backoff_delay, retry_after, PRIORITY_BACKGROUND
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError
 
 load_dotenv()
 
 # Local uploaded image path (you previously uploaded this file)
 UPLOADED_IMAGE_PATH = "/mnt/data/255b1193-876b-44ba-ac3c-26616b4008e3.png"
 
-# Helper: simple competitor hints (extend as needed)
-DEFAULT_COMPETITORS = {
-    "zoom": ["Microsoft Teams", "Google Meet", "Cisco Webex"],
-    "openai": ["Anthropic", "Cohere", "Google DeepMind"],
-    "tesla": ["Ford", "GM", "BYD"],
-    "meta": ["Google", "Snap", "TikTok"]
-}
+# Competitor pages scraped alongside the company's own seeds (same concurrent batch, so no added latency)
+PREFETCH_COMPETITORS = int(os.getenv("PREFETCH_COMPETITORS", "3"))
+# Pages crawled from the company's site for a dig-deeper round (plans use CRAWL_MAX_PAGES)
+DIG_DEEPER_PAGES = int(os.getenv("DIG_DEEPER_PAGES", "6"))
+
+# Plan generation: "single" = one call for the whole schema, "sectioned" = SECTION_GROUPS in parallel
+PLAN_GENERATION_MODE = os.getenv("PLAN_GENERATION_MODE", "single").lower()
+PLAN_SECTION_CONCURRENCY = int(os.getenv("PLAN_SECTION_CONCURRENCY", "3"))
+SECTION_MAX_TOKENS = 450
+CONDENSED_FORMATS = ("short", "pitch", "bullets")
+
+# JSON mode for plan/section/patch calls; disable for OpenAI-compatible backends that reject response_format
+JSON_RESPONSE_FORMAT = {"type": "json_object"} if os.getenv("LLM_JSON_MODE", "true").lower() in ("1", "true", "yes") else None
+
+class ProgressLog(list):
+    """Progress entries for one request, optionally mirrored to a live listener (SSE, jobs)."""
+
+    def __init__(self, on_event=None):
+        super().__init__()
+        self.on_event = on_event
+
 
 class AgentController:
     def __init__(self):
-        # OpenAI client
-        self.client = OpenAI()
-        # session state map: session_id -> plan JSON + metadata
-        self.sessions = {}  # e.g. {session_id: {"plan":..., "sources":..., "pending_conflict":..., ...}}
+        # OpenAI client (async, so LLM calls never block the event loop)
+        self.client = AsyncOpenAI()
+        # session state: session_id -> plan JSON + metadata (memory LRU or SQLite, see SESSION_BACKEND)
+        self.sessions = create_session_store()  # e.g. {"plan":..., "sources":..., "pending_conflict":..., ...}
         # Demo helper: environment toggle to force conflicts
         self.force_conflict = os.getenv("FORCE_CONFLICT", "false").lower() in ("1", "true", "yes")
+        # in-flight plan research keyed by (company, format, persona, priority), shared across sessions
+        self._plan_flight = SingleFlight()
+        # precomputed baseline plans for hot companies; refreshed in the background once started
+        self.warm_cache = WarmCache(self)
 
     # ----------------- Utility helpers -----------------
-    def safe_llm_call(self, messages, max_retries=4, temperature=0.2, max_tokens=1200):
-        """Reliable wrapper for OpenAI API calls with retry + exponential backoff."""
-        delay = 1
+    async def safe_llm_call(self, messages, max_retries=4, temperature=0.2, max_tokens=1200, use_cache=True, on_token=None,
+                            priority=None, response_format=None, on_reset=None):
+        """Reliable wrapper for OpenAI API calls, scheduled through the shared rate limiter.
+
+        If `on_token` is given the completion is streamed and each text delta is passed to it. A stream that
+        fails after some deltas is only retried if `on_reset` is given; it is called first so the listener
+        can discard what it received.
+        `response_format` (e.g. JSON_RESPONSE_FORMAT) is passed through to the API.
+        `priority` defaults to the task's current_priority (interactive unless set by a background job).
+        """
+        model = os.getenv("LLM_MODEL", "gpt-4o-mini")
+        cache_key = None
+        if use_cache:
+            cache_key = make_key(model, messages, temperature=temperature, max_tokens=max_tokens,
+                                 response_format=response_format)
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                if on_token:
+                    on_token(cached)
+                return cached_response(cached)
+
+        limiter = get_limiter(model)
+        priority = current_priority.get() if priority is None else priority
+        # reserve prompt + worst-case completion tokens; the unused part is refunded afterwards
+        reserved = sum(count_tokens(str(m.get("content", "")), model) for m in messages) + max_tokens
+        extra = {"response_format": response_format} if response_format else {}
 
         for attempt in range(max_retries):
+            streamed = []
+            await limiter.acquire(reserved, priority)
             try:
-                response = self.client.chat.completions.create(
-                    model=os.getenv("LLM_MODEL", "gpt-4o-mini"),
+                if on_token:
+                    text, headers = await self._stream_completion(model, messages, temperature, max_tokens, on_token, extra,
+                                                                  parts=streamed)
+                    limiter.update_from_headers(headers)
+                    limiter.release(reserved, reserved - max_tokens + count_tokens(text, model))
+                    if cache_key:
+                        llm_cache.set(cache_key, text)
+                    return cached_response(text, cached=False)
+
+                raw = await self.client.chat.completions.with_raw_response.create(
+                    model=model,
                     messages=messages,
                     temperature=temperature,
-                    max_tokens=max_tokens
+                    max_tokens=max_tokens,
+                    **extra
                 )
+                limiter.update_from_headers(raw.headers)
+                response = raw.parse()
+                usage = getattr(response, "usage", None)
+                limiter.release(reserved, getattr(usage, "total_tokens", None))
+                if cache_key and response.choices:
+                    llm_cache.set(cache_key, response.choices[0].message.content)
                 return response
 
             except Exception as e:
-                err = str(e).lower()
-
-                # 429 or overload → retry
-                if "rate limit" in err or "429" in err or "overloaded" in err:
+                # a stream cut off part-way still used the prompt and everything generated so far
+                partial = "".join(streamed)
+                limiter.release(reserved, reserved - max_tokens + count_tokens(partial, model) if partial else 0)
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                limiter.update_from_headers(headers)
+                status = getattr(e, "status_code", None)
+
+                # 429 / overload / transient network → retry with jittered backoff
+                if isinstance(e, (RateLimitError, APIConnectionError)) or status in (429, 500, 502, 503, 529):
                     if attempt == max_retries - 1:
                         return None  # final fail
-                    time.sleep(delay)
-                    delay *= 2
+                    if partial:
+                        if on_reset is None:
+                            return None  # the listener already has half an answer and no way to drop it
+                        on_reset()
+                    delay = backoff_delay(attempt, retry_after(headers))
+                    if status == 429 or isinstance(e, RateLimitError):
+                        limiter.pause(delay)
+                    await asyncio.sleep(delay)
                     continue
 
                 # Other error → no retry
@@ -62,181 +147,180 @@ class AgentController:
                 return None
 
         return None
-    def _progress(self):
-        """Create a new progress list for a request."""
-        return []
+
+    async def _stream_completion(self, model, messages, temperature, max_tokens, on_token, extra=None, parts=None):
+        raw = await self.client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            **(extra or {})
+        )
+        stream = raw.parse()
+        parts = [] if parts is None else parts   # the caller's list sees deltas even if the stream breaks
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                on_token(delta)
+        return "".join(parts), raw.headers
+
+    def _progress(self, on_event=None):
+        """Create a new progress list for a request. `on_event(kind, data)` sees each entry as it is added."""
+        return ProgressLog(on_event)
 
     def _add_progress(self, progress_list, message):
-        progress_list.append({"ts": time.time(), "msg": message})
-
-    def detect_persona(self, message: str) -> str:
-        """Detect simple persona from message text."""
-        m = message.lower()
-        if any(w in m for w in ["don't know", "not sure", "help me", "i'm confused", "what should"]):
-            return "confused"
-        if any(w in m for w in ["short", "quick", "tl;dr", "summary", "brief"]):
-            return "efficient"
-        if len(m.split()) > 30 or any(w in m for w in ["story", "so anyway", "by the way", "btw"]):
-            return "chatty"
-        return "unknown"
-
-    def detect_format(self, message: str) -> str:
-        """Detect requested output format: short/detailed/pitch/bullets."""
-        m = message.lower()
-        if any(w in m for w in ["pitch", "investor", "one-pager"]):
-            return "pitch"
-        if any(w in m for w in ["short", "brief", "summary", "tl;dr"]):
-            return "short"
-        if any(w in m for w in ["bullet", "bullets", "list"]):
-            return "bullets"
-        return "detailed"
-
-    def extract_company(self, message: str) -> str:
-        """Naive extraction: 'for <company>' or last proper noun-like word."""
-        words = message.split()
-        if "for" in words:
-            idx = words.index("for")
-            if idx + 1 < len(words):
-                candidate = words[idx + 1].strip().strip(".,!?")
-                # remove common words accidentally picked
-                if candidate.lower() not in ["me", "us", "that", "this"]:
-                    return re.sub(r'[^A-Za-z0-9\-]', '', candidate)
-        # fallback: try last word
-        last = words[-1].strip().strip(".,!?")
-        return re.sub(r'[^A-Za-z0-9\-]', '', last) or "UnknownCompany"
-
-    def add_sources(self, session_id, urls=None, local_files=None, progress=None):
+        entry = {"ts": time.time(), "msg": message}
+        progress_list.append(entry)
+        on_event = getattr(progress_list, "on_event", None)
+        if on_event:
+            on_event("progress", entry)
+
+    async def add_sources(self, session_id, urls=None, local_files=None, progress=None, company=None):
         """Scrape URLs and add docs to retriever. Returns list of sources added."""
         sources = []
+        docs = []
         if urls:
-            for url in urls:
-                try:
-                    if progress is not None:
-                        self._add_progress(progress, f"Scraping {url}...")
-                    scraped = scrape_url(url)
-                    text = scraped.get("text", "") or ""
-                    title = scraped.get("title") or url
-                    doc = {"url": url, "title": title, "text": text}
-                    # add to retriever (assumes retriever.add exists)
-                    try:
-                        retriever.add(doc)
-                    except Exception:
-                        # maintaining compatibility: some retrievers call add_doc
-                        if hasattr(retriever, "add_doc"):
-                            retriever.add_doc(doc)
-                        else:
-                            # fallback: append to internal list if present
-                            if hasattr(retriever, "docs"):
-                                retriever.docs.append(doc)
-                    sources.append({"url": url, "title": title, "date": ""})
-                    if progress is not None:
-                        self._add_progress(progress, f"Added source: {url}")
-                except Exception as e:
-                    if progress is not None:
-                        self._add_progress(progress, f"Failed to scrape {url}: {str(e)}")
+            if progress is not None:
+                for url in urls:
+                    self._add_progress(progress, f"Scraping {url}...")
+            # fetch every url at once; wall-clock time is the slowest source
+            try:
+                results = await scrape_many_async(urls)
+            except Exception as e:
+                results = [{"url": url, "text": ""} for url in urls]
+                if progress is not None:
+                    self._add_progress(progress, f"Scraping failed: {str(e)}")
+            for url, scraped in zip(urls, results):
+                doc, source = self._source_doc(url, scraped)
+                docs.append(doc)
+                sources.append(source)
+                if progress is not None:
+                    self._add_progress(progress, f"Added source: {url}")
         if local_files:
             for lf in local_files:
                 title = lf.get("title", "local-file")
-                doc = {"url": lf.get("url", ""), "title": title, "text": lf.get("text", "")}
-                try:
-                    retriever.add(doc)
-                except Exception:
-                    if hasattr(retriever, "add_doc"):
-                        retriever.add_doc(doc)
-                    elif hasattr(retriever, "docs"):
-                        retriever.docs.append(doc)
+                docs.append({"url": lf.get("url", ""), "title": title, "text": lf.get("text", "")})
                 sources.append({"url": lf.get("url"), "title": title, "date": lf.get("date", "")})
                 if progress is not None:
                     self._add_progress(progress, f"Added local source: {title}")
+        if docs:
+            # chunk + embed all new docs in one batched pass, off the event loop
+            try:
+                await asyncio.to_thread(retriever.add_many, docs, namespace_key(session_id, company))
+                if progress is not None:
+                    self._add_progress(progress, f"Indexed {len(docs)} docs for retrieval.")
+            except Exception as e:
+                if progress is not None:
+                    self._add_progress(progress, f"Failed to index sources: {str(e)}")
         return sources
 
-    def get_retrieved_context(self, progress=None):
-        """Return a combined context string built from top retrieved docs."""
+    @staticmethod
+    def _source_doc(url, scraped, subject=None, competitor=False):
+        """Retriever document and source entry for one scraped page about `subject`."""
+        title = scraped.get("title") or url
+        date = scraped.get("date", "")
+        doc = {"url": url, "title": title, "text": scraped.get("text", "") or "", "date": date}
+        if subject:
+            doc["subject"] = subject
+        if competitor:
+            doc["competitor"] = True
+        if scraped.get("organization"):
+            doc["organization"] = scraped["organization"]
+        return doc, {"url": url, "title": title, "date": date}
+
+    async def crawl_sources(self, session_id, seeds, expand=(), topic=None, max_pages=CRAWL_MAX_PAGES,
+                            known=(), progress=None, company=None, competitor_pages=None):
+        """Crawl from `seeds` (following links on the `expand` sites) and index each page as it arrives.
+
+        `competitor_pages` maps seed urls to the competitor they describe; those docs are tagged so
+        retrieval and conflict detection can tell them apart from the company's own pages.
+        """
+        namespace = namespace_key(session_id, company)
+        competitor_pages = {canonical_url(u): name for u, name in (competitor_pages or {}).items()}
+        sources = []
+        indexing = []
+
+        async def on_doc(scraped):
+            competitor = competitor_pages.get(canonical_url(scraped["url"]))
+            doc, source = self._source_doc(scraped["url"], scraped, subject=competitor or company,
+                                           competitor=competitor is not None)
+            sources.append(source)
+            if progress is not None:
+                self._add_progress(progress, f"Added source: {doc['url']}")
+            # embed while the crawl continues
+            indexing.append(asyncio.create_task(asyncio.to_thread(retriever.add_many, [doc], namespace)))
+
+        if progress is not None:
+            self._add_progress(progress, f"Crawling {len(seeds)} seed pages (up to {max_pages} pages)...")
         try:
-            docs = retriever.get_top()
-        except Exception:
-            # compatibility: some retrievers provide docs attribute
-            docs = getattr(retriever, "docs", [])[:5]
-        context_pieces = []
-        for d in docs:
-            title = d.get("title", d.get("url", "source"))
-            text = d.get("text", "")[:2000]
-            context_pieces.append(f"[{title} | {d.get('url','')}] \n{text}")
+            await Crawler(max_pages=max_pages, topic=topic).crawl(seeds, on_doc, expand=expand, known=known)
+        except Exception as e:
+            print("CRAWL ERROR:", e)
+            if progress is not None:
+                self._add_progress(progress, f"Crawl stopped early: {str(e)}")
+        failed = [r for r in await asyncio.gather(*indexing, return_exceptions=True) if isinstance(r, Exception)]
         if progress is not None:
-            self._add_progress(progress, f"Built context from {len(context_pieces)} docs.")
-        return "\n\n".join(context_pieces), docs
+            self._add_progress(progress, f"Indexed {len(sources) - len(failed)} crawled pages for retrieval.")
+        return sources
+
+    async def get_retrieved_context(self, query=None, progress=None, k=24, session_id=None, company=None, keywords=None,
+                                    include_competitors=True):
+        """Return a context string packed from the chunks most relevant to `query`, within the model's token budget.
 
+        Ranking fuses embedding similarity to `query` with BM25 on `keywords` (default: the query itself).
+        """
+        try:
+            candidates = await asyncio.to_thread(
+                retriever.get_top, k, query, namespace_key(session_id, company), keywords, include_competitors
+            )
+        except Exception:
+            candidates = []
+        model = os.getenv("LLM_MODEL", "gpt-4o-mini")
+        context, docs, stats = await asyncio.to_thread(build_context, candidates, model)
+        if progress is not None:
+            self._add_progress(
+                progress,
+                f"Built context from {len(docs)} relevant chunks "
+                f"({stats['tokens']}/{stats['budget']} tokens, {stats['duplicates']} near-duplicates dropped)."
+            )
+        return context, docs
     def detect_competitors(self, company: str):
-        key = company.lower()
-        return DEFAULT_COMPETITORS.get(key, [])
+        return competitor_graph.competitors(company)
 
     # ----------------- Intent / Main handler -----------------
-    def detect_intent(self, message: str):
-        msg = message.lower().strip()
-
-        # CHATTY user should override greeting
-        if len(msg.split()) > 12:  
-            return "chatty"
-
-        # Confused user
-        if any(w in msg for w in [
-            "i don't know", 
-            "not sure", 
-            "help me figure",
-            "no idea"
-        ]):
-            return "confused"
-
-        # Greeting detection
-        if any(w in msg for w in ["hello", "hi", "hey", "hlo"]):
-            return "greeting"
-
-        # Smalltalk / who are you
-        if any(w in msg for w in ["who are you", "how are you", "what's up"]):
-            return "smalltalk"
-
-        # Efficient/quick user
-        if any(w in msg for w in ["short", "brief", "quick", "tl;dr"]):
-            return "efficient"
-
-        # Account plan intent
-        if any(w in msg for w in ["account plan", "create", "generate", "research"]):
-            return "account_plan"
-
-        return "unknown"
-
-
-    def handle_message(self, message, session_id=None):
+    async def handle_message(self, message, session_id=None, on_event=None):
         session_id = session_id or "anon"
         msg = message.lower().strip()
 
         # If pending conflict — keep same logic
-        session = self.sessions.get(session_id, {})
+        session = await self.sessions.aget(session_id) or {}
         pending_topic = session.get("pending_conflict")
 
         if pending_topic:
             if msg in ["yes", "go ahead", "dig deeper", "yes please"]:
-                session.pop("pending_conflict", None)
-                return self.dig_deeper(session_id, pending_topic)
+                await self.sessions.aupdate(session_id, remove=("pending_conflict",))
+                return await self.dig_deeper(session_id, pending_topic, on_event=on_event)
             elif msg in ["no", "skip"]:
-                session.pop("pending_conflict", None)
+                await self.sessions.aupdate(session_id, remove=("pending_conflict",))
                 return {"reply": "Okay, skipping deep research.", "account_plan": session.get("plan")}
             else:
                 return {"reply": f"Say 'yes' to dig deeper into {pending_topic} or 'no' to skip."}
 
-        session = self.sessions.setdefault(session_id, {})
-
         # Check if user is responding to suggestion
         if "pending_suggestion" in session:
             suggested_company = session["pending_suggestion"]
 
             if msg in ["yes", "yeah", "yep", "sure", "go ahead", "do it", "please do"]:
                 # User accepted
-                session.pop("pending_suggestion", None)
-                return self.generate_plan(f"create an account plan for {suggested_company}", session_id)
+                await self.sessions.aupdate(session_id, remove=("pending_suggestion",))
+                return await self.generate_plan(f"create an account plan for {suggested_company}", session_id, on_event=on_event)
 
             elif msg in ["no", "no thanks", "not now"]:
-                session.pop("pending_suggestion", None)
+                await self.sessions.aupdate(session_id, remove=("pending_suggestion",))
                 return {"reply": "Okay! Let me know if you want to research another company."}
 
             # User said something else → remind them
@@ -245,8 +329,9 @@ class AgentController:
             }
 
         
-        # Persona detection
-        intent = self.detect_intent(message)
+        # Intent, persona, format and company in one pass over the message
+        classified = classify(message)
+        intent = classified.intent
         print("DETECTED INTENT:", intent)
 
         if intent == "greeting":
@@ -259,10 +344,11 @@ class AgentController:
             return {"reply": "No worries. I can research any company and generate an account plan. Want to try something like: 'Create an account plan for Tesla'?"}
 
         if intent == "chatty":
-            company = self.extract_company_name(message)  # we'll define this below
+            resolution = company_resolver.resolve(message)
+            company = resolution.company.name if resolution else classified.known_company
 
             if company:
-                self.sessions[session_id]["pending_suggestion"] = company
+                await self.sessions.aupdate(session_id, {"pending_suggestion": company})
                 return {
                     "reply": f"You sound curious! It seems you're interested in {company}. Want me to research it for you?"
                 }
@@ -273,122 +359,88 @@ class AgentController:
             return {"reply": "Got it — I can make a short version. Tell me: 'Create a short account plan for <company>'."}
 
         if intent == "account_plan":
-            return self.generate_plan(message, session_id)
+            return await self.generate_plan(message, session_id, on_event=on_event, classification=classified)
 
         # Unknown fallback
         return {"reply": "I can generate account plans. Try: 'Create an account plan for Zoom'."}
 
-    def extract_company_name(self, msg: str):
-        companies = ["openai", "zoom", "tesla", "meta", "google", "nvidia", "microsoft"]
-        for c in companies:
-            if c in msg.lower():
-                return c.capitalize()
-        return None
-
     
     # ----------------- Plan generation -----------------
-    def generate_plan(self, message, session_id, persona="unknown", out_format="detailed"):
+    def resolve_company(self, message, classification=None):
+        """(company name, Resolution or None): the canonical gazetteer name when known, else the raw guess."""
+        classified = classification or classify(message)
+        resolution = company_resolver.resolve(message, classified.candidates)
+        return (resolution.company.name if resolution else classified.company), resolution
+
+    async def generate_plan(self, message, session_id, persona=None, out_format=None, on_event=None, classification=None):
         session_id = session_id or "anon"
-        progress = self._progress()
-        if session_id in self.sessions:
-            self.sessions[session_id].pop("pending_conflict", None)
+        progress = self._progress(on_event)
+        await self.sessions.aupdate(session_id, remove=("pending_conflict",))
         self._add_progress(progress, "Received request, detecting company and preferences...")
-        company = self.extract_company(message)
-        self._add_progress(progress, f"Detected company: {company}")
+        classified = classification or classify(message)
+        company, resolution = self.resolve_company(message, classified)
+        persona = persona or classified.persona
+        out_format = out_format or classified.format
+        self._add_progress(progress, f"Detected company: {company} (persona: {persona}, format: {out_format})")
+        if resolution and resolution.method == "fuzzy":
+            self._add_progress(progress, f"Interpreted '{resolution.matched}' as {company}.")
 
         # detect competitors & format
         competitors = self.detect_competitors(company)
         if competitors:
             self._add_progress(progress, f"Found competitors: {', '.join(competitors)}")
 
-        # seed urls to scrape
-        seed_urls = [
-            f"https://{company}.com",
-            f"https://www.{company}.com",
-            f"https://en.wikipedia.org/wiki/{company}"
-        ]
-        self._add_progress(progress, "Preparing seed sources for scraping...")
-
-        # include uploaded file as local source (use your provided path)
-        local_files = [
-            {"url": UPLOADED_IMAGE_PATH, "title": f"{company} - uploaded file", "text": "", "date": ""}
-        ]
-
-        # Add sources (scrape + local)
-        sources_added = self.add_sources(session_id, urls=seed_urls, local_files=local_files, progress=progress)
-
-        # retrieve top docs and build context
-        context, docs = self.get_retrieved_context(progress=progress)
-
-        # Build RAG prompt
-        rag_prompt = RAG_PROMPT.format(context=context, request=message, schema=ACCOUNT_PLAN_SCHEMA)
-
-        # Include a short system prompt with persona-awareness and output formatting instruction
-        system_msg = {
-            "role": "system",
-            "content": (
-                "You are ResearchGPT — produce a structured account plan in JSON following the schema. "
-                f"User persona: {persona}. Output preference: {out_format}. If asked, provide a short summary, pitch, or bullets. "
-                "If facts conflict across sources, include a 'conflicts' field listing the differing values and their sources."
-            )
-        }
-
-        user_msg = {"role": "user", "content": rag_prompt}
-        self._add_progress(progress, "Calling LLM to generate account plan...")
-
-        # Call the LLM
-        try:
-            response = self.safe_llm_call(
-                messages=[system_msg, user_msg],
-                temperature=0.2,
-                max_tokens=1200
+        # Hot companies are served from a precomputed baseline; only persona/format tailoring runs live
+        self.warm_cache.note_request(company)
+        research = self.warm_cache.get(company, message)
+        if research is not None and not retriever.clone_namespace(research["namespace"], namespace_key(session_id, company)):
+            # its indexed documents are gone (e.g. restarted without RETRIEVER_PERSIST): rebuild, answer live
+            self.warm_cache.refresh_soon(company.lower())
+            research = None
+        if research is not None:
+            shared = True
+            self._add_progress(progress, f"Using precomputed research for {company} ({int(research['age'] // 60)} min old).")
+            research = await self._tailor_research(research, company, persona, progress)
+        else:
+            # Concurrent requests for the same company/format/persona share one scrape + LLM run. Priority is
+            # part of the key: an interactive request must not queue behind a background job's flight.
+            flight_key = (company.lower(), out_format, persona, current_priority.get())
+            research, shared = await self._plan_flight.do(
+                flight_key,
+                lambda: self._research_plan(message, session_id, company, persona, out_format, progress, on_event,
+                                            resolution, competitors)
             )
+            if shared:
+                self._add_progress(progress, f"Joined in-flight research for {company}; reusing its result.")
+                # give this session its own copy of the indexed docs for dig-deeper
+                retriever.clone_namespace(research["namespace"], namespace_key(session_id, company))
+        sources_added = research["sources"]
+        docs = research["docs"]
+
+        if research["error"]:
+            return {"reply": "Failed to generate plan via LLM.", "error": research["error"], "progress": progress, "sources": sources_added}
+        if research["text"] is None:
+            return {
+                "reply": "⚠️ The AI is temporarily overloaded. Please try again in 5–10 seconds.",
+                "account_plan": None,
+                "progress": progress,
+                "sources": sources_added
+            }
 
-            if response is None:
-                return {
-                    "reply": "⚠️ The AI is temporarily overloaded. Please try again in 5–10 seconds.",
-                    "account_plan": None,
-                    "progress": progress,
-                    "sources": sources_added
-                }
-
-            text = response.choices[0].message.content
-
-            self._add_progress(progress, "Received response from LLM.")
-        except Exception as e:
-            self._add_progress(progress, f"LLM call failed: {str(e)}")
-            # return partial progress and error
-            return {"reply": "Failed to generate plan via LLM.", "error": str(e), "progress": progress, "sources": sources_added}
-
-        # parse/clean potential triple-backticked JSON
-        clean = text
-        if clean.startswith("```"):
-            clean = re.sub(r"^```(?:json)?", "", clean, flags=re.IGNORECASE).rstrip("`").strip()
-
-        parsed = None
-        try:
-            parsed = json.loads(clean)
-        except Exception:
-            # fallback: put raw text into snapshot.raw_output
-            parsed = {"raw_output": text}
+        # sessions edit their plan in place, so never share the dict between them
+        parsed = copy.deepcopy(research["parsed"])
 
         # Persist session
-        self.sessions[session_id] = {
+        await self.sessions.aset(session_id, {
             "plan": parsed,
             "sources": sources_added or [],
+            "company": company,
             "last_query": message,
             "timestamp": time.time()
-        }
-
-        # Quick fact extraction for conflict heuristic (revenue/employees)
-        facts = []
-        try:
-            snap = parsed.get("snapshot", {})
-            if snap:
-                facts.append(("revenue", str(snap.get("revenue_estimate")), "generated"))
-                facts.append(("employees", str(snap.get("employees_estimate")), "generated"))
-        except Exception:
-            pass
+        })
+        # learn competitor edges from this plan (once per coalesced run)
+        if not shared:
+            await asyncio.to_thread(competitor_graph.observe, company, parsed)
 
         # If forced conflict mode is ON, simulate a conflict (useful for demos)
         if self.force_conflict:
@@ -399,7 +451,7 @@ class AgentController:
                 ]
             }
             topic = "revenue"
-            self.sessions[session_id]["pending_conflict"] = topic
+            await self.sessions.aupdate(session_id, {"pending_conflict": topic})
             self._add_progress(progress, "Forced conflict mode ON: simulating conflict on revenue.")
             return {
                 "reply": f"I found conflicting information about {topic}. Should I dig deeper?",
@@ -410,36 +462,14 @@ class AgentController:
                 "format": out_format
             }
 
-        # Heuristic conflict detection: if different values exist across retrieved docs
-        conflicts = {}
-        # Very naive: look inside docs text for revenue/employee patterns and compare
-        def find_numeric_in_text(patterns, docs):
-            found = {}
-            for doc in docs:
-                txt = (doc.get("text") or "").lower()
-                src = doc.get("url") or doc.get("title") or "source"
-                for pat in patterns:
-                    match = re.search(pat, txt)
-                    if match:
-                        val = match.group(1).strip()
-                        found.setdefault(val, []).append(src)
-            return found
-
-        # patterns to extract simple numbers like "$123 billion" or "127,000 employees"
-        revenue_patterns = [r"\$([\d\.,]+\s?(?:billion|million|bn|m|B|M))", r"revenue(?:\s*[:\-]?\s*)([\d\.,]+\s?(?:billion|million|bn|m))"]
-        employees_patterns = [r"([\d\.,]+\s?employees)", r"([\d\.,]+\s?staff)"]
-
-        rev_found = find_numeric_in_text(revenue_patterns, docs)
-        emp_found = find_numeric_in_text(employees_patterns, docs)
-
-        if len(rev_found.keys()) > 1:
-            conflicts["revenue"] = [{"value": v, "sources": s} for v, s in rev_found.items()]
-        if len(emp_found.keys()) > 1:
-            conflicts["employees"] = [{"value": v, "sources": s} for v, s in emp_found.items()]
+        # detected on the retrieved docs before generation (_research_plan); older cached research lacks it
+        conflicts = research.get("conflicts")
+        if conflicts is None:
+            conflicts = await asyncio.to_thread(detect_conflicts, [d for d in docs if not d.get("competitor")])
 
         if conflicts:
             topic = list(conflicts.keys())[0]
-            self.sessions[session_id]["pending_conflict"] = topic
+            await self.sessions.aupdate(session_id, {"pending_conflict": topic})
             self._add_progress(progress, f"Detected conflicts on {topic}. Asking user to dig deeper.")
             return {
                 "reply": f"I found conflicting information about {topic}. Should I dig deeper?",
@@ -451,31 +481,10 @@ class AgentController:
             }
 
         # No conflicts -> produce final response. Also produce alternative condensed formats if requested
-        summary_text = None
-        try:
-            # If user wanted a short/pitch/bullets format, ask the LLM for a condensed version
-            if out_format in ("short", "pitch", "bullets"):
-                self._add_progress(progress, f"Generating {out_format} version of the plan...")
-                short_prompt = (
-                    f"Given the following account plan JSON:\n{json.dumps(parsed)}\n\n"
-                    + ("Provide a concise 3-line summary." if out_format == "short" else
-                       "Provide a pitch-style one-paragraph summary." if out_format == "pitch" else
-                       "Provide the plan as 6 concise bullet points.")
-                )
-                short_resp = self.safe_llm_call(
-                    messages=[{"role":"system","content":"You are a summarizer."},
-                            {"role":"user","content":short_prompt}],
-                    temperature=0.2,
-                    max_tokens=300
-                )
-
-                if short_resp:
-                    summary_text = short_resp.choices[0].message.content
-
-                self._add_progress(progress, f"Generated {out_format} version.")
-        except Exception as e:
-            self._add_progress(progress, f"Failed to generate condensed format: {str(e)}")
-            summary_text = None
+        # (sectioned mode already built it from the snapshot while the other sections were generating)
+        summary_text = research.get("summary")
+        if summary_text is None and out_format in CONDENSED_FORMATS:
+            summary_text = await self._condensed_summary(parsed, out_format, progress, persona)
 
         self._add_progress(progress, "Completed plan generation.")
 
@@ -491,26 +500,292 @@ class AgentController:
 
         return response
 
+    async def _condensed_summary(self, plan, out_format, progress, persona=None):
+        """Short/pitch/bullets rendering of a plan (or of just its snapshot)."""
+        system = "You are a summarizer."
+        if persona in PERSONA_TONES:
+            system += " " + PERSONA_TONES[persona]
+        try:
+            self._add_progress(progress, f"Generating {out_format} version of the plan...")
+            short_prompt = (
+                f"Given the following account plan JSON:\n{json.dumps(plan)}\n\n"
+                + ("Provide a concise 3-line summary." if out_format == "short" else
+                   "Provide a pitch-style one-paragraph summary." if out_format == "pitch" else
+                   "Provide the plan as 6 concise bullet points.")
+            )
+            short_resp = await self.safe_llm_call(
+                messages=[{"role":"system","content":system},
+                        {"role":"user","content":short_prompt}],
+                temperature=0.2,
+                max_tokens=300
+            )
+            self._add_progress(progress, f"Generated {out_format} version.")
+            if short_resp:
+                return short_resp.choices[0].message.content
+        except Exception as e:
+            self._add_progress(progress, f"Failed to generate condensed format: {str(e)}")
+        return None
+
+    def _plan_system_msg(self, persona, out_format, competitors=()):
+        content = (
+            "You are ResearchGPT — produce a structured account plan in JSON following the schema. "
+            f"User persona: {persona}. Output preference: {out_format}. If asked, provide a short summary, pitch, or bullets. "
+            "If facts conflict across sources, include a 'conflicts' field listing the differing values and their sources."
+        )
+        if competitors:
+            content += f" Known competitors to cover in competitive_landscape: {', '.join(competitors)}."
+        return {"role": "system", "content": content}
+
+    async def _generate_sections(self, result, context, message, company, persona, out_format, progress, competitors=(),
+                                 contexts=None):
+        """Generate each SECTION_GROUPS slice concurrently and merge them into one validated plan.
+
+        `contexts` overrides `context` for individual sections (by SECTION_GROUPS name).
+        """
+        sem = asyncio.Semaphore(PLAN_SECTION_CONCURRENCY)
+        system_msg = self._plan_system_msg(persona, out_format, competitors)
+        summary_task = None
+
+        async def run_section(name, schema):
+            nonlocal summary_task
+            prompt = SECTION_PROMPT.format(context=(contexts or {}).get(name, context), request=message, company=company,
+                                           schema=schema)
+            try:
+                async with sem:
+                    response = await self.safe_llm_call(
+                        messages=[system_msg, {"role": "user", "content": prompt}],
+                        temperature=0.2,
+                        max_tokens=SECTION_MAX_TOKENS,
+                        response_format=JSON_RESPONSE_FORMAT
+                    )
+            except Exception as e:
+                self._add_progress(progress, f"Section '{name}' failed: {str(e)}")
+                return None
+            if response is None:
+                self._add_progress(progress, f"Section '{name}' failed: model overloaded.")
+                return None
+            part, repaired = parse_json(response.choices[0].message.content)
+            self._add_progress(progress, f"Generated section: {name}" + (" (repaired JSON)" if repaired and part else ""))
+            # the condensed summary only needs the snapshot, so start it now -- unless the reply will be a
+            # conflict question instead of the plan
+            if (name == "snapshot" and part and out_format in CONDENSED_FORMATS and not result["conflicts"]
+                    and not self.force_conflict):
+                summary_task = asyncio.create_task(self._condensed_summary(part, out_format, progress, persona))
+            return part
+
+        self._add_progress(progress, f"Calling LLM for {len(SECTION_GROUPS)} plan sections in parallel...")
+        parts = await asyncio.gather(*(run_section(n, schema) for n, schema in SECTION_GROUPS.items()))
+
+        plan = {}
+        conflicts = {}
+        for part in parts:
+            if not part:
+                continue
+            found = part.pop("conflicts", None)
+            if isinstance(found, dict):
+                conflicts.update(found)
+            plan.update(part)
+        if summary_task is not None:
+            result["summary"] = await summary_task
+        if not plan:
+            return result  # every section failed -> treated like an overloaded model
+
+        plan["sources"] = result["sources"]
+        plan = validate_plan(plan)
+        if conflicts:
+            plan["conflicts"] = conflicts
+        self._add_progress(progress, "Merged plan sections.")
+        result["text"] = json.dumps(plan)
+        result["parsed"] = plan
+        return result
+
+    async def research_company(self, company, session_id="anon", message=None, persona="unknown", out_format="detailed",
+                               progress=None):
+        """Crawl, index and draft a plan for `company` outside a chat turn (e.g. background warming).
+
+        Returns the research dict (sources, docs, namespace, conflicts, text, parsed, summary, error); the crawled
+        documents stay indexed under namespace_key(session_id, company).
+        """
+        message = message or f"Create an account plan for {company}"
+        progress = progress if progress is not None else self._progress()
+        return await self._research_plan(message, session_id, company, persona, out_format, progress,
+                                         resolution=company_resolver.resolve(company),
+                                         competitors=self.detect_competitors(company))
+
+    async def _tailor_research(self, research, company, persona, progress):
+        """Adapt a baseline (warm cache) plan to the requester's tone (PERSONA_TONES) with one small JSON-patch call.
+
+        The output format is applied afterwards like on the live path (condensed summary), so the
+        baseline's own summary is dropped.
+        """
+        research = dict(research, summary=None)
+        plan = research["parsed"]
+        # "unknown" (and any persona without a tone) reads the baseline as is: no LLM call
+        if not plan or persona == research.get("persona") or persona not in PERSONA_TONES:
+            return research
+        self._add_progress(progress, f"Tailoring the plan for persona: {persona}...")
+        prompt = PERSONA_PATCH_PROMPT.format(company=company, plan=json.dumps(plan), tone=PERSONA_TONES[persona])
+        try:
+            response = await self.safe_llm_call(
+                messages=[{"role":"system","content":"You are ResearchGPT; return a minimal JSON patch for the account plan."},
+                          {"role":"user","content":prompt}],
+                max_tokens=600,
+                response_format=JSON_RESPONSE_FORMAT
+            )
+        except Exception as e:
+            self._add_progress(progress, f"Persona tailoring failed: {str(e)}")
+            return research
+        if response is None:
+            self._add_progress(progress, "Persona tailoring skipped: model overloaded.")
+            return research
+        patch = (parse_json(response.choices[0].message.content)[0] or {}).get("patch", [])
+        tailorable = set(plan) - {"company_name", "sources", "confidence"}
+        tailored, applied = apply_json_patch(plan, patch, allowed_roots=tailorable)
+        tailored = validate_plan(tailored)
+        self._add_progress(progress, f"Tailored {len(applied)} field(s) for {persona}.")
+        return dict(research, parsed=tailored, text=json.dumps(tailored))
+
+    async def _research_plan(self, message, session_id, company, persona, out_format, progress, on_event=None,
+                             resolution=None, competitors=()):
+        """Scrape, retrieve and call the LLM for one plan. Shared by coalesced callers via _plan_flight."""
+        # seed urls: the resolved domain (crawled further), or a single guess for unknown companies,
+        # plus top competitors' pages fetched in the same crawl (and served from the scrape cache next time)
+        urls = seed_urls(resolution, company)
+        site = urls[0]
+        competitor_pages = {competitor_url(c): c for c in competitors[:PREFETCH_COMPETITORS]}
+        urls += list(competitor_pages)
+        self._add_progress(progress, "Preparing seed sources for scraping...")
+
+        # include uploaded file as local source (use your provided path)
+        local_files = [
+            {"url": UPLOADED_IMAGE_PATH, "title": f"{company} - uploaded file", "text": "", "date": ""}
+        ]
+
+        # Add sources (crawl + local)
+        sources_added = await self.crawl_sources(session_id, urls, expand=[site], progress=progress, company=company,
+                                                 competitor_pages=competitor_pages)
+        sources_added += await self.add_sources(session_id, local_files=local_files, progress=progress, company=company)
+
+        # retrieve top docs and build context
+        context, docs = await self.get_retrieved_context(query=message, progress=progress, session_id=session_id, company=company)
+        result = {
+            "sources": sources_added,
+            "docs": docs,
+            "namespace": namespace_key(session_id, company),
+            # Typed facts across retrieved docs, units/currencies normalized; only real disagreement counts.
+            # Competitor pages state the competitor's revenue, CEO, ... and would always "disagree".
+            "conflicts": await asyncio.to_thread(detect_conflicts, [d for d in docs if not d.get("competitor")]),
+            "text": None,
+            "parsed": None,
+            "summary": None,
+            "error": None,
+        }
+
+        if PLAN_GENERATION_MODE == "sectioned":
+            # the snapshot describes the company itself, so it only sees the company's own pages
+            snapshot_context, _ = await self.get_retrieved_context(
+                query=message, session_id=session_id, company=company, include_competitors=False
+            )
+            return await self._generate_sections(result, context, message, company, persona, out_format, progress,
+                                                 competitors, contexts={"snapshot": snapshot_context})
+
+        # Build RAG prompt
+        rag_prompt = RAG_PROMPT.format(context=context, request=message, company=company, schema=ACCOUNT_PLAN_SCHEMA)
+
+        # Include a short system prompt with persona-awareness and output formatting instruction
+        system_msg = self._plan_system_msg(persona, out_format, competitors)
+
+        user_msg = {"role": "user", "content": rag_prompt}
+        self._add_progress(progress, "Calling LLM to generate account plan...")
+
+        # Call the LLM; a second, uncached attempt is made only if the output can't be repaired locally
+        for attempt in range(2):
+            parser = None
+            on_token = None
+            on_reset = None
+            if on_event:
+                # validate sections as they stream so the client sees them land
+                def new_parser():
+                    return IncrementalPlanParser(
+                        on_section=lambda name, ok: self._add_progress(
+                            progress, f"Validated section: {name}" if ok else f"Section {name} needs repair")
+                    )
+                parser = new_parser()
+
+                def on_token(delta):
+                    parser.feed(delta)
+                    on_event("token", {"text": delta})
+
+                def on_reset():
+                    # the stream broke part-way and is being retried: start over on both ends
+                    nonlocal parser
+                    parser = new_parser()
+                    on_event("reset", {})
+
+            try:
+                response = await self.safe_llm_call(
+                    messages=[system_msg, user_msg],
+                    temperature=0.2,
+                    max_tokens=1200,
+                    on_token=on_token,
+                    on_reset=on_reset,
+                    response_format=JSON_RESPONSE_FORMAT,
+                    use_cache=attempt == 0
+                )
+
+                if response is None:
+                    return result
+
+                text = response.choices[0].message.content
+
+                self._add_progress(progress, "Received response from LLM.")
+            except Exception as e:
+                self._add_progress(progress, f"LLM call failed: {str(e)}")
+                result["error"] = str(e)
+                return result
+
+            parsed, status = parser.result() if parser else parse_plan(text)
+            if parsed is not None:
+                break
+            self._add_progress(progress, "LLM returned invalid JSON; retrying once.")
+        else:
+            result["error"] = "The model did not return a valid account plan."
+            return result
+
+        if status == "repaired":
+            self._add_progress(progress, "Repaired malformed JSON from the LLM.")
+
+        result["text"] = json.dumps(parsed)
+        result["parsed"] = parsed
+        return result
+
     # ----------------- Dig deeper -----------------
-    def dig_deeper(self, session_id, topic):
+    async def dig_deeper(self, session_id, topic, on_event=None):
         session_id = session_id or "anon"
-        session = self.sessions.get(session_id)
+        session = await self.sessions.aget(session_id)
         if not session:
             return {"reply": "Session not found. Generate an account plan first."}
 
-        progress = self._progress()
+        progress = self._progress(on_event)
         self._add_progress(progress, f"Starting deep-dive on {topic}...")
 
-        # Expanded sources (demo): news, sec filings (placeholder)
-        extra_urls = [
-            f"https://www.google.com/search?q={topic}+{session.get('last_query','')}",
-            f"https://news.google.com/search?q={topic}+{session.get('last_query','')}"
-        ]
+        # Crawl deeper into the company's own site, favouring pages about the topic (investor
+        # relations for revenue, leadership for the CEO, ...) and skipping pages already indexed
+        company = session.get("company") or ""
+        site = seed_urls(company_resolver.resolve(company), company)[0]
         self._add_progress(progress, "Adding deeper sources...")
-        self.add_sources(session_id, urls=extra_urls, progress=progress)
+        await self.crawl_sources(
+            session_id, [site], expand=[site], topic=topic, max_pages=DIG_DEEPER_PAGES,
+            known=[s.get("url") for s in session.get("sources") or [] if s.get("url")],
+            progress=progress, company=session.get("company"),
+        )
 
-        # rebuild context
-        context, docs = self.get_retrieved_context(progress=progress)
+        # rebuild context around the topic being reconciled
+        context, docs = await self.get_retrieved_context(
+            query=f"{topic} {session.get('last_query','')}", progress=progress,
+            session_id=session_id, company=session.get("company"),
+            keywords=" ".join([topic, session.get("company") or "", *TOPIC_TERMS.get(topic, ())])
+        )
 
         prompt = (
             "You are doing a deeper research for the specific topic: " + topic + "\n\n"
@@ -521,12 +796,15 @@ class AgentController:
 
         self._add_progress(progress, "Calling LLM for reconciliation...")
         try:
-            response = self.safe_llm_call(
+            response = await self.safe_llm_call(
                 messages=[
                     {"role":"system","content":"You are a research assistant that reconciles facts using new context."},
                     {"role":"user","content":prompt}
                 ],
-                max_tokens=500
+                max_tokens=500,
+                priority=PRIORITY_BACKGROUND,
+                on_token=(lambda delta: on_event("token", {"text": delta})) if on_event else None,
+                on_reset=(lambda: on_event("reset", {})) if on_event else None
             )
 
             if response is None:
@@ -545,12 +823,14 @@ class AgentController:
         return {"reply": f"Deep-dive on '{topic}' complete.", "reconciliation": text, "progress": progress}
 
     # ----------------- Edit section -----------------
-    def edit_section(self, session_id, section, new_content):
+    async def edit_section(self, session_id, section, new_content, on_event=None):
         session_id = session_id or "anon"
-        session = self.sessions.get(session_id)
+        session = await self.sessions.aget(session_id)
         if not session:
             return {"error": "Session not found. Generate a plan first."}
 
+        progress = self._progress(on_event)
+        self._add_progress(progress, f"Applying edit to {section}...")
         plan = session.get("plan", {})
         # allow editing nested keys using dot notation
         if "." in section:
@@ -558,7 +838,7 @@ class AgentController:
             if top in plan and isinstance(plan[top], dict):
                 plan[top][sub] = new_content
             else:
-                return {"error": "Section not recognized."}
+                return {"error": "Section not recognized.", "progress": progress}
         else:
             # top-level replacement; attempt to parse JSON for lists/objects
             if section in plan and not isinstance(plan[section], list) and not isinstance(plan[section], dict):
@@ -569,37 +849,54 @@ class AgentController:
                     plan[section] = parsed_content
                 except Exception:
                     plan[section] = new_content
-
-        # Ask LLM to re-summarize updated plan
-        re_prompt = (
-            "User edited the account plan. Update and re-summarize the entire account plan to keep it consistent.\n\n"
-            "Current plan (JSON):\n" + json.dumps(plan) + "\n\n"
-            "Schema:\n" + ACCOUNT_PLAN_SCHEMA + "\n\n"
-            "Produce valid JSON following the schema."
+        # keep the user's edit even if the update below fails
+        await self.sessions.aupdate(session_id, {"plan": plan})
+
+        dependents = [d for d in dependents_of(section) if d in plan]
+        if not dependents:
+            # leaf edit: nothing else derives from this field, no LLM call needed
+            self._add_progress(progress, "Section updated; no dependent sections to refresh.")
+            return {"reply": "Section updated.", "account_plan": plan, "regenerated": [], "progress": progress}
+
+        self._add_progress(progress, f"Refreshing dependent sections: {', '.join(dependents)}...")
+        top = section.split(".", 1)[0]
+        re_prompt = EDIT_PATCH_PROMPT.format(
+            section=section,
+            new_value=json.dumps(plan.get(top) if "." in section else plan[section]),
+            dependents=json.dumps({d: plan[d] for d in dependents}),
+            snapshot=json.dumps(plan.get("snapshot", {})),
+            dependent_names=", ".join(dependents)
         )
 
         try:
-            response = self.safe_llm_call(
+            response = await self.safe_llm_call(
                 messages=[
-                    {"role":"system","content":"You are ResearchGPT; produce a corrected plan JSON."},
+                    {"role":"system","content":"You are ResearchGPT; return a minimal JSON patch for the account plan."},
                     {"role":"user","content":re_prompt}
                 ],
-                max_tokens=1000
+                max_tokens=600,
+                response_format=JSON_RESPONSE_FORMAT
             )
 
             if response is None:
-                return {"reply": "⚠️ AI temporarily overloaded. Please try again.", "account_plan": plan}
+                return {"reply": "⚠️ AI temporarily overloaded. Please try again.", "account_plan": plan, "progress": progress}
 
             text = response.choices[0].message.content
 
         except Exception as e:
-            return {"reply":"Failed to re-summarize plan.", "error": str(e)}
+            self._add_progress(progress, f"Refreshing dependent sections failed: {str(e)}")
+            return {"reply":"Failed to update dependent sections.", "error": str(e), "account_plan": plan, "progress": progress}
 
-        try:
-            updated_plan = json.loads(text)
-        except Exception:
-            updated_plan = {"raw_output": text}
+        patch = (parse_json(text)[0] or {}).get("patch", [])
+        updated_plan, applied = apply_json_patch(plan, patch, allowed_roots=set(dependents))
 
         # save back to session
-        self.sessions[session_id]["plan"] = updated_plan
-        return {"reply":"Section updated and plan re-summarized.", "account_plan": updated_plan}
+        await self.sessions.aupdate(session_id, {"plan": updated_plan})
+        regenerated = sorted({p[1:].split("/")[0] for p in applied})
+        self._add_progress(progress, f"Refreshed {len(regenerated)} dependent section(s).")
+        return {
+            "reply": "Section updated and dependent sections refreshed.",
+            "account_plan": updated_plan,
+            "progress": progress,
+            "regenerated": regenerated,
+        }
@@ -0,0 +1,151 @@
+import os
+import threading
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # optional (pip install faiss-cpu): exact search only
+    faiss = None
+
+# "hnsw" switches a namespace to a faiss HNSW graph once it holds RETRIEVER_ANN_MIN vectors; "exact" never does.
+# Opt-in: a namespace is one company's crawl (~50 chunks), where a matmul takes well under a millisecond.
+ANN_BACKEND = os.getenv("RETRIEVER_ANN", "exact").lower()
+# Below this size a brute-force matmul is as fast as the graph and always exact
+ANN_MIN_VECTORS = int(os.getenv("RETRIEVER_ANN_MIN", "20000"))
+HNSW_M = int(os.getenv("HNSW_M", "32"))                          # graph degree: memory vs recall
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "128"))           # search beam: latency vs recall
+
+
+class ExactIndex:
+    """Brute-force inner product over a growable float32 matrix; ids are insertion order."""
+
+    kind = "exact"
+
+    def __init__(self, vectors=None):
+        self.vectors = vectors      # (capacity, dim); rows [:count] are live
+        self.count = 0 if vectors is None else len(vectors)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return 0 if self.vectors is None else self.vectors.nbytes
+
+    def add(self, vecs):
+        with self._lock:
+            n = self.count
+            if self.vectors is None:
+                self.vectors = np.empty((max(len(vecs), 256), vecs.shape[1]), dtype=np.float32)
+            elif n + len(vecs) > len(self.vectors):
+                # grow geometrically so appends stay amortised O(1) and the matrix stays contiguous
+                grown = np.empty((max(2 * len(self.vectors), n + len(vecs)), self.vectors.shape[1]), dtype=np.float32)
+                grown[:n] = self.vectors[:n]
+                self.vectors = grown
+            self.vectors[n:n + len(vecs)] = vecs
+            self.count = n + len(vecs)
+
+    def matrix(self):
+        return None if self.vectors is None else self.vectors[:self.count]
+
+    def search(self, query, k, limit=None):
+        """Ids of the k rows with the highest inner product with `query`, best first."""
+        with self._lock:
+            n = self.count if limit is None else min(limit, self.count)
+            vectors = self.vectors
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        scores = vectors[:n] @ query
+        if k < n:
+            idx = np.argpartition(-scores, k - 1)[:k]
+        else:
+            idx = np.arange(n)
+        return idx[np.argsort(-scores[idx])]
+
+    def copy(self):
+        matrix = self.matrix()
+        return ExactIndex(None if matrix is None else matrix.copy())
+
+    def save(self, path):
+        np.save(path + ".npy", self.matrix())
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(path + ".npy"))
+
+
+class HNSWIndex:
+    """faiss HNSW graph over inner product. Inserts are incremental; ids are insertion order."""
+
+    kind = "hnsw"
+
+    def __init__(self, dim=None, index=None):
+        if index is None:
+            index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        self.index = index
+        self._lock = threading.Lock()   # faiss does not allow a search concurrent with an add
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @property
+    def nbytes(self):
+        # stored vectors plus roughly 2*M int32 neighbour slots per node on the base layer
+        return self.index.ntotal * (4 * self.index.d + 8 * HNSW_M)
+
+    def add(self, vecs):
+        with self._lock:
+            self.index.add(np.ascontiguousarray(vecs, dtype=np.float32))
+
+    def matrix(self):
+        with self._lock:
+            return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def search(self, query, k, limit=None):
+        with self._lock:
+            self.index.hnsw.efSearch = max(HNSW_EF_SEARCH, k)
+            _, ids = self.index.search(np.ascontiguousarray(query, dtype=np.float32)[None, :], k)
+        ids = ids[0]
+        keep = ids >= 0
+        if limit is not None:
+            keep &= ids < limit
+        return ids[keep]
+
+    def copy(self):
+        with self._lock:
+            return HNSWIndex(index=faiss.clone_index(self.index))
+
+    def save(self, path):
+        with self._lock:
+            faiss.write_index(self.index, path + ".faiss")
+
+    @classmethod
+    def load(cls, path):
+        return cls(index=faiss.read_index(path + ".faiss"))
+
+
+INDEX_TYPES = {"exact": ExactIndex, "hnsw": HNSWIndex}
+
+
+def ann_available():
+    return faiss is not None and ANN_BACKEND == "hnsw"
+
+
+def maybe_promote(index, min_vectors=ANN_MIN_VECTORS):
+    """Return an HNSW index holding the same vectors once an exact index has grown past `min_vectors`."""
+    if index.kind != "exact" or len(index) < min_vectors or not ann_available():
+        return index
+    matrix = index.matrix()
+    ann = HNSWIndex(matrix.shape[1])
+    ann.add(matrix)
+    return ann
+
+
+def load_index(kind, path):
+    if kind == "hnsw" and faiss is None:
+        raise RuntimeError("faiss is not installed; cannot load an HNSW index")
+    return INDEX_TYPES[kind].load(path)
@@ -1,8 +1,16 @@
+import asyncio
+import inspect
+import json
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from agent_controller import AgentController
+from retriever import retriever
+from llm_cache import llm_cache
+from jobs import JobManager, QueueFull
 
 load_dotenv()
 
@@ -30,6 +38,14 @@ app.add_middleware(
 
 
 agent = AgentController()
+jobs = JobManager(agent)
+
+
+async def run_agent(fn, *args):
+    """Await async agent methods; push any remaining sync code onto the thread pool."""
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args)
+    return await run_in_threadpool(fn, *args)
 
 # ===== MODELS =====
 class ChatRequest(BaseModel):
@@ -45,20 +61,67 @@ class DigRequest(BaseModel):
     session_id: str
     topic: str
 
+class JobRequest(BaseModel):
+    kind: str                          # "plan" | "dig_deeper" | "edit"
+    session_id: str | None = None
+    message: str | None = None         # plan
+    topic: str | None = None           # dig_deeper
+    section: str | None = None         # edit
+    new_content: str | None = None     # edit
+
 
 # ===== ROUTES =====
 @app.post("/chat")
 async def chat(req: ChatRequest):
     try:
-        return agent.handle_message(req.message, req.session_id)
+        return await run_agent(agent.handle_message, req.message, req.session_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Server-Sent Events: `progress` and `token` events as they happen, then one `result` event."""
+    queue = asyncio.Queue()
+
+    def on_event(kind, data):
+        queue.put_nowait((kind, data))
+
+    async def run():
+        try:
+            result = await agent.handle_message(req.message, req.session_id, on_event=on_event)
+            queue.put_nowait(("result", result))
+        except Exception as e:
+            queue.put_nowait(("error", {"detail": str(e)}))
+        finally:
+            queue.put_nowait(None)
+
+    task = asyncio.create_task(run())
+
+    async def events():
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                kind, data = item
+                yield f"event: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            # client went away before we finished
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/edit-section")
 async def edit_section(req: EditSectionRequest):
     try:
-        return agent.edit_section(req.session_id, req.section, req.new_content)
+        return await run_agent(agent.edit_section, req.session_id, req.section, req.new_content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -66,14 +129,53 @@ async def edit_section(req: EditSectionRequest):
 @app.post("/dig-deeper")
 async def dig_deeper(req: DigRequest):
     try:
-        return agent.dig_deeper(req.session_id, req.topic)
+        return await run_agent(agent.dig_deeper, req.session_id, req.topic)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.on_event("startup")
+async def start_jobs():
+    await jobs.start()
+    # restore saved retriever namespaces (no-op unless RETRIEVER_PERSIST is on)
+    await asyncio.to_thread(retriever.load)
+    await agent.warm_cache.start()
+
+
+@app.on_event("shutdown")
+async def stop_jobs():
+    await jobs.stop()
+    await agent.warm_cache.stop()
+    await asyncio.to_thread(retriever.save)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(req: JobRequest):
+    try:
+        job, deduped = jobs.submit(req.kind, req.model_dump(exclude={"kind"}))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return {"job_id": job.id, "status": job.status, "deduplicated": deduped}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
+
+@app.options("/jobs")
+def options_jobs():
+    return {}
+
+
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "llm_cache": llm_cache.stats(), "warm_cache": agent.warm_cache.stats()}
 
 
 # ✅ FIX 3 — ADD THIS to handle preflight OPTIONS request
@@ -82,6 +184,11 @@ def options_chat():
     return {}
 
 
+@app.options("/chat/stream")
+def options_chat_stream():
+    return {}
+
+
 @app.options("/edit-section")
 def options_edit():
     return {}
@@ -93,7 +200,8 @@ def options_dig():
 
 @app.post("/reset")
 def reset(session_id: str = "default-session"):
-    agent.sessions.pop(session_id, None)
+    agent.sessions.delete(session_id)
+    retriever.evict_session(session_id)
     return {"reply": "Session cleared. Start fresh!"}
 
 @app.get("/")
@@ -106,13 +214,13 @@ logging.basicConfig(level=logging.INFO)
 @app.post("/chat")
 async def chat(req: ChatRequest):
     logging.info(f"User said: {req.message}")
-    response = agent.handle_message(req.message, req.session_id)
+    response = await run_agent(agent.handle_message, req.message, req.session_id)
     return response
 @app.post("/reset")
 def reset_session():
     try:
-        if "default-session" in agent.sessions:
-            del agent.sessions["default-session"]
+        agent.sessions.delete("default-session")
+        retriever.evict_session("default-session")
         return {"reply": "Session reset successfully."}
     except:
         return {"reply": "Session was already clear."}
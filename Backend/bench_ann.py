@@ -0,0 +1,68 @@
+# backend/bench_ann.py
+# Recall vs latency of the HNSW retriever index against exact search:
+#   python bench_ann.py [sizes...]       (default: 10000 100000 1000000; BENCH_DIM sets the dimension)
+import os
+import sys
+import time
+
+import numpy as np
+
+import ann_index
+from ann_index import ExactIndex, HNSWIndex
+
+DIM = int(os.getenv("BENCH_DIM", "256"))
+QUERIES = 200
+K = 10
+EF_VALUES = (16, 32, 64, 128, 256)
+
+
+def corpus(n, dim, rng):
+    """Clustered unit vectors: real chunk embeddings are grouped by page and topic, not uniform."""
+    centers = rng.standard_normal((max(n // 200, 8), dim), dtype=np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100_000):   # bounded temporaries for the 1M case
+        end = min(start + 100_000, n)
+        out[start:end] = centers[rng.integers(len(centers), size=end - start)]
+        out[start:end] += 0.6 * rng.standard_normal((end - start, dim), dtype=np.float32)
+    out /= np.linalg.norm(out, axis=1, keepdims=True)
+    return out
+
+
+def per_query_ms(index, queries):
+    start = time.perf_counter()
+    results = [index.search(q, K) for q in queries]
+    return (time.perf_counter() - start) / len(queries) * 1e3, results
+
+
+def recall(results, truth):
+    return np.mean([len(set(r.tolist()) & set(t.tolist())) / K for r, t in zip(results, truth)])
+
+
+def bench(n, rng):
+    vectors = corpus(n, DIM, rng)
+    queries = vectors[rng.integers(n, size=QUERIES)] + 0.2 * rng.standard_normal((QUERIES, DIM), dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = ExactIndex()
+    exact.add(vectors)
+    exact_ms, truth = per_query_ms(exact, queries)
+    print(f"\n{n:,} chunks x {DIM} dims")
+    print(f"  exact      {exact_ms:8.3f} ms/query  recall@{K} 1.000")
+
+    start = time.perf_counter()
+    hnsw = HNSWIndex(DIM)
+    hnsw.add(vectors)
+    print(f"  hnsw build {time.perf_counter() - start:8.1f} s  (M={ann_index.HNSW_M}, efConstruction={ann_index.HNSW_EF_CONSTRUCTION})")
+    for ef in EF_VALUES:
+        ann_index.HNSW_EF_SEARCH = ef
+        ms, results = per_query_ms(hnsw, queries)
+        print(f"  hnsw ef={ef:<4}{ms:8.3f} ms/query  recall@{K} {recall(results, truth):.3f}  ({exact_ms / ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    if ann_index.faiss is None:
+        sys.exit("faiss is not installed: pip install faiss-cpu")
+    sizes = [int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        bench(n, rng)
@@ -0,0 +1,48 @@
+# backend/bench_classifier.py
+# Microbenchmark for intent_classifier.classify: python bench_classifier.py [iterations]
+import re
+import sys
+import timeit
+
+from intent_classifier import (
+    classify, INTENT_KEYWORDS, PERSONA_KEYWORDS, FORMAT_KEYWORDS, KNOWN_COMPANIES,
+)
+
+MESSAGES = [
+    "hi",
+    "Create an account plan for Zoom",
+    "create a short account plan for Tesla please",
+    "I don't know where to start, can you help me figure it out?",
+    "generate an investor pitch for OpenAI",
+    "research nvidia and give me bullets",
+    "who are you?",
+    "tl;dr on Microsoft",
+    "By the way I was reading a long story about Google and their new models and I wondered what "
+    "their go-to-market looks like for enterprise customers in Europe and Asia these days",
+]
+
+
+def legacy(message):
+    """The previous approach: one lowercase + substring scan per question asked of the message."""
+    m = message.lower()
+    scans = [INTENT_KEYWORDS[k] for k in INTENT_KEYWORDS] + [PERSONA_KEYWORDS[k] for k in PERSONA_KEYWORDS]
+    scans += [FORMAT_KEYWORDS[k] for k in FORMAT_KEYWORDS] + [KNOWN_COMPANIES]
+    hits = [any(w in m for w in words) for words in scans]
+    words = message.split()
+    company = words[words.index("for") + 1] if "for" in words[:-1] else words[-1]
+    return hits, len(m.split()), re.sub(r"[^A-Za-z0-9\-]", "", company)
+
+
+def bench(fn, iterations):
+    seconds = timeit.timeit(lambda: [fn(m) for m in MESSAGES], number=iterations)
+    return seconds / (iterations * len(MESSAGES)) * 1e6
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for m in MESSAGES[:3]:
+        print(f"{m!r} -> {classify(m)}")
+    new, old = bench(classify, iterations), bench(legacy, iterations)
+    print(f"classify: {new:.2f} us/message")
+    print(f"legacy:   {old:.2f} us/message (multiple substring scans)")
+    print(f"speedup:  {old / new:.2f}x")
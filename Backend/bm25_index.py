@@ -0,0 +1,99 @@
+import math
+import re
+import threading
+from array import array
+
+import numpy as np
+
+# BM25 parameters (Okapi defaults)
+K1 = 1.2
+B = 0.75
+# Reciprocal rank fusion constant: larger values flatten the advantage of the very top ranks
+RRF_K = 60
+
+# Keeps tickers, versions and names like "at&t" or "gpt-4o" as single tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[&.\-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the their this to was were with "
+    "what which who how about create generate make give me please plan account research".split()
+)
+_MAX_TF = 65535   # term frequencies are stored as uint16
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index over chunk ids 0..n-1 with array-backed postings, appended to incrementally.
+
+    Each term maps to two parallel arrays: chunk ids (int32, ascending) and term frequencies (uint16).
+    """
+
+    def __init__(self):
+        self.postings = {}            # term -> (array('i') chunk ids, array('H') term frequencies)
+        self.lengths = array("i")     # tokens per chunk
+        self.total_length = 0
+        self.nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, texts):
+        """Index texts as the next chunk ids, in order."""
+        with self._lock:
+            before = self.nbytes
+            for text in texts:
+                doc_id = len(self.lengths)
+                tokens = tokenize(text)
+                counts = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    entry = self.postings.get(token)
+                    if entry is None:
+                        entry = self.postings[token] = (array("i"), array("H"))
+                        self.nbytes += 2 * len(token) + 64
+                    entry[0].append(doc_id)
+                    entry[1].append(min(tf, _MAX_TF))
+                self.lengths.append(len(tokens))
+                self.total_length += len(tokens)
+                self.nbytes += 4 + 6 * len(counts)
+            return self.nbytes - before
+
+    def search(self, query, k, limit=None):
+        """Top-k chunk ids and BM25 scores for `query`, considering only ids below `limit`."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self.lengths) if limit is None else min(limit, len(self.lengths))
+            if not terms or n == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            lengths = np.frombuffer(self.lengths, dtype=np.int32, count=n).astype(np.float32)
+            norm = K1 * (1 - B + B * lengths / (self.total_length / len(self.lengths) or 1.0))
+            scores = np.zeros(n, dtype=np.float32)
+            for term in terms:
+                entry = self.postings.get(term)
+                if entry is None:
+                    continue
+                ids = np.frombuffer(entry[0], dtype=np.int32)
+                tf = np.frombuffer(entry[1], dtype=np.uint16).astype(np.float32)
+                if ids[-1] >= n:
+                    keep = ids < n
+                    ids, tf = ids[keep], tf[keep]
+                idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+                scores[ids] += idf * tf * (K1 + 1) / (tf + norm[ids])
+        hits = np.flatnonzero(scores)
+        if k < len(hits):
+            hits = hits[np.argpartition(-scores[hits], k)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return hits, scores[hits]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse several best-first id rankings: score(id) = sum over rankings of 1 / (k + rank)."""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking.tolist() if hasattr(ranking, "tolist") else ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))
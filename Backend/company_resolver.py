@@ -0,0 +1,223 @@
+import json
+import os
+import re
+import unicodedata
+from typing import NamedTuple
+
+COMPANIES_PATH = os.getenv("COMPANIES_PATH", os.path.join(os.path.dirname(__file__), "data", "companies.json"))
+
+# Legal suffixes dropped from names/aliases before indexing ("Palantir Technologies Inc." -> "palantir technologies")
+LEGAL_SUFFIXES = {"inc", "incorporated", "corp", "corporation", "company", "co", "ltd", "limited", "plc", "llc", "ag", "sa", "nv"}
+
+# Fuzzy (SymSpell) matching only for keys/queries at least this long; short names are too easy to hit by accident
+FUZZY_MIN_LEN = 5
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+class Company(NamedTuple):
+    name: str
+    domain: str
+    wikipedia: str
+    common_word: bool = False   # single-word aliases need a capital letter or an explicit "for <name>"
+
+
+class Resolution(NamedTuple):
+    company: Company
+    matched: str        # the message text that matched
+    method: str         # exact | fuzzy
+    distance: int = 0
+
+
+def normalize(text):
+    """Lowercase, strip accents, '&' -> 'and', punctuation -> spaces. Returns a token list."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower().replace("&", " and ")
+    return _NON_ALNUM_RE.sub(" ", text).split()
+
+
+def _key_tokens(text):
+    tokens = normalize(text)
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens = tokens[:-1]
+    return tokens
+
+
+def _deletes(word, distance):
+    """Every string reachable from `word` by deleting up to `distance` characters (SymSpell)."""
+    out = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def _max_distance(word):
+    return 1 if len(word) < 8 else 2
+
+
+def _one_edit(a, b):
+    """Distance between a != b when it is at most 1 (incl. adjacent swap), else 2."""
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        if a[i + 1:] == b[i + 1:]:
+            return 1   # substitution
+        if a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]:
+            return 1   # adjacent swap
+        return 2
+    return 1 if a[i:] == b[i + 1:] else 2   # insertion/deletion
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, or limit + 1 once it is certainly above `limit`."""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if limit == 1:
+        return _one_edit(a, b)
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class CompanyResolver:
+    """Gazetteer of known companies: a token trie for exact mentions plus a SymSpell deletes index for typos."""
+
+    def __init__(self, entries=()):
+        self.companies = []
+        self.trie = {}        # token -> child node; "$" marks the end of an alias
+        self.compact = {}     # "cocacola" -> Company, for fuzzy verification
+        self.deletes = {}     # SymSpell delete variant -> set of compact keys
+        for entry in entries:
+            self.add(entry)
+
+    @classmethod
+    def load(cls, path=COMPANIES_PATH):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError) as e:
+            print("COMPANY GAZETTEER ERROR:", e)
+            return cls()
+
+    def add(self, entry):
+        company = Company(entry["name"], entry["domain"], entry.get("wikipedia") or entry["name"].replace(" ", "_"),
+                          bool(entry.get("common_word")))
+        self.companies.append(company)
+        for alias in [company.name, *entry.get("aliases", [])]:
+            tokens = _key_tokens(alias)
+            if not tokens:
+                continue
+            node = self.trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault("$", company)
+            key = "".join(tokens)
+            if len(key) >= FUZZY_MIN_LEN and key not in self.compact:
+                self.compact[key] = company
+                for variant in _deletes(key, _max_distance(key)):
+                    self.deletes.setdefault(variant, set()).add(key)
+
+    def lookup(self, name):
+        """Exact lookup of a name or alias, or None."""
+        node = self.trie
+        for token in _key_tokens(name):
+            node = node.get(token)
+            if node is None:
+                return None
+        return node.get("$")
+
+    def fuzzy(self, name):
+        """Closest known company within the SymSpell edit distance, as (company, distance), or None."""
+        query = "".join(_key_tokens(name))
+        if len(query) < FUZZY_MIN_LEN:
+            return None
+        limit = _max_distance(query)
+        keys = set()
+        for variant in _deletes(query, limit):
+            keys.update(self.deletes.get(variant, ()))
+        best = None
+        for key in keys:
+            d = edit_distance(query, key, limit)
+            if d <= limit and (best is None or (d, key) < best):
+                best = (d, key)
+        return (self.compact[best[1]], best[0]) if best else None
+
+    def _mentions(self, message):
+        """Longest alias match at every token position: [(start, end, company)]."""
+        words = message.split()
+        # keep the index of the original word alongside normalized tokens so capitalization can be checked
+        tokens = []
+        for k, word in enumerate(words):
+            tokens.extend((tok, k) for tok in normalize(word))
+        found = []
+        i = 0
+        while i < len(tokens):
+            node, match = self.trie, None
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j][0])
+                if node is None:
+                    break
+                if "$" in node:
+                    match = (j + 1, node["$"])
+            if match:
+                end, company = match
+                single = end - i == 1
+                if not (company.common_word and single and not words[tokens[i][1]][:1].isupper()):
+                    # one word can yield several tokens ("Coca-Cola"): quote each original word once
+                    text = " ".join(words[k] for k in dict.fromkeys(t[1] for t in tokens[i:end]))
+                    found.append((i, end, company, text))
+                    i = end
+                    continue
+            i += 1
+        return found
+
+    def resolve(self, message, candidates=()):
+        """Best company for a message: explicit candidates first, then any mention, then typo-tolerant match.
+
+        `candidates` are strings the caller already believes name the company (e.g. the word after "for").
+        """
+        for candidate in candidates:
+            company = self.lookup(candidate)
+            if company:
+                return Resolution(company, candidate, "exact")
+        mentions = self._mentions(message or "")
+        if mentions:
+            # prefer multi-word matches ("Bank of America" over "America"), then the earliest
+            start, end, company, text = max(mentions, key=lambda m: (m[1] - m[0], -m[0]))
+            return Resolution(company, text, "exact")
+        words = [w for w in (message or "").split()[1:] if w[:1].isupper()]
+        for candidate in [*candidates, *words]:
+            hit = self.fuzzy(candidate)
+            if hit:
+                return Resolution(hit[0], candidate, "fuzzy", hit[1])
+        return None
+
+
+def seed_urls(resolution, name):
+    """Pages to scrape for a company: its real domain when known, else a single .com guess."""
+    if resolution is not None:
+        company = resolution.company
+        return [f"https://{company.domain}", f"https://en.wikipedia.org/wiki/{company.wikipedia}"]
+    slug = "".join(normalize(name)) or name
+    return [f"https://{slug}.com", f"https://en.wikipedia.org/wiki/{name}"]
+
+
+company_resolver = CompanyResolver.load()
@@ -0,0 +1,121 @@
+import heapq
+import json
+import os
+import threading
+
+from company_resolver import company_resolver
+from scrape_cache import CACHE_DIR
+
+SEED_PATH = os.getenv("COMPETITORS_PATH", os.path.join(os.path.dirname(__file__), "data", "competitors.json"))
+# Edges learned from generated plans live next to the other caches, not in the checked-in dataset
+LEARNED_PATH = os.getenv("COMPETITORS_LEARNED_PATH", os.path.join(CACHE_DIR, "competitors_learned.json"))
+
+# Weight added per plan that lists a competitor, saturating at LEARNED_CAP per edge. Seed edges are 1-3,
+# so learning can reorder near-ties among seeded competitors but a learned-only edge never outranks one.
+LEARNED_WEIGHT = 0.5
+LEARNED_CAP = 0.9
+# The reverse edge of a learned pair gets a smaller boost: competition is usually, not always, mutual
+REVERSE_FACTOR = 0.5
+MAX_COMPETITORS = int(os.getenv("MAX_COMPETITORS", "5"))
+
+
+def canonical(name):
+    """Gazetteer name when known ("msft" -> "Microsoft"), else the trimmed input."""
+    name = " ".join((name or "").split())
+    company = company_resolver.lookup(name) if name else None
+    return company.name if company else name
+
+
+class CompetitorGraph:
+    """Weighted competitor adjacency: key -> {neighbor key -> weight}, keys are lowercase canonical names."""
+
+    def __init__(self, seed_path=SEED_PATH, learned_path=LEARNED_PATH):
+        self.learned_path = learned_path
+        self.adj = {}
+        self.names = {}     # key -> display name
+        self.learned = {}   # key -> {neighbor key -> learned weight}, persisted separately
+        self._lock = threading.Lock()
+        self._load(seed_path, learned=False)
+        if learned_path:
+            self._load(learned_path, learned=True)
+
+    def _load(self, path, learned):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print("COMPETITOR GRAPH ERROR:", e)
+            return
+        for company, neighbors in data.items():
+            for competitor, weight in neighbors.items():
+                self._add(company, competitor, float(weight), learned=learned)
+
+    def _key(self, name):
+        name = canonical(name)
+        key = name.lower()
+        self.names.setdefault(key, name)
+        return key
+
+    def _add(self, company, competitor, weight, learned=False):
+        a, b = self._key(company), self._key(competitor)
+        if not a or not b or a == b:
+            return
+        if learned:
+            mine = self.learned.setdefault(a, {})
+            before = mine.get(b, 0.0)
+            mine[b] = min(before + weight, LEARNED_CAP)
+            weight = mine[b] - before
+        edges = self.adj.setdefault(a, {})
+        edges[b] = edges.get(b, 0.0) + weight
+
+    def competitors(self, company, k=MAX_COMPETITORS):
+        """Top-k competitors by weight (ties broken by name)."""
+        edges = self.adj.get(canonical(company).lower())
+        if not edges:
+            return []
+        top = heapq.nsmallest(k, edges.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [self.names[key] for key, _ in top]
+
+    def observe(self, company, plan):
+        """Learn edges from a generated plan's competitive_landscape and persist them."""
+        entries = (plan or {}).get("competitive_landscape") or []
+        names = []
+        for entry in entries if isinstance(entries, list) else []:
+            name = entry.get("competitor") if isinstance(entry, dict) else entry
+            if isinstance(name, str) and name.strip():
+                names.append(name.strip())
+        if not names:
+            return 0
+        with self._lock:
+            for name in names:
+                self._add(company, name, LEARNED_WEIGHT, learned=True)
+                self._add(name, company, LEARNED_WEIGHT * REVERSE_FACTOR, learned=True)
+            self._save()
+        return len(names)
+
+    def _save(self):
+        if not self.learned_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.learned_path), exist_ok=True)
+            tmp = self.learned_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(
+                    {self.names[a]: {self.names[b]: round(w, 3) for b, w in edges.items()} for a, edges in self.learned.items()},
+                    f, ensure_ascii=False, indent=1,
+                )
+            os.replace(tmp, self.learned_path)
+        except OSError as e:
+            print("COMPETITOR GRAPH ERROR:", e)
+
+
+def competitor_url(name):
+    """One page per competitor for prefetching: its Wikipedia article (best signal per request)."""
+    company = company_resolver.lookup(name)
+    title = company.wikipedia if company else name.replace(" ", "_")
+    return f"https://en.wikipedia.org/wiki/{title}"
+
+
+competitor_graph = CompetitorGraph()
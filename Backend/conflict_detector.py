@@ -0,0 +1,183 @@
+import os
+import re
+
+import numpy as np
+
+# Relative tolerance within which two numeric values are "the same fact"
+# (revenue differs by rounding/fiscal year, headcounts by date of the snapshot)
+TOLERANCES = {"revenue": 0.15, "employees": 0.15, "founded": 0.0}
+# Minimum disagreement score (0..1) before we ask the user to dig deeper
+CONFLICT_MIN_SCORE = float(os.getenv("CONFLICT_MIN_SCORE", "0.3"))
+
+# Approximate USD rates; only used to put figures on one scale before comparing them
+USD_RATES = {"$": 1.0, "us$": 1.0, "usd": 1.0, "€": 1.08, "eur": 1.08, "£": 1.27, "gbp": 1.27, "¥": 0.0068, "jpy": 0.0068}
+UNITS = {
+    "trillion": 1e12, "tn": 1e12, "t": 1e12,
+    "billion": 1e9, "bn": 1e9, "b": 1e9,
+    "million": 1e6, "mn": 1e6, "mm": 1e6, "m": 1e6,
+    "thousand": 1e3, "k": 1e3,
+}
+
+_NUM = r"\d[\d,]*(?:\.\d+)?"
+_UNIT = r"(?:trillion|billion|million|thousand|bn|tn|mn|mm|[tbmk])\b"
+_CUR = r"(?:us\$|\$|€|£|¥|usd|eur|gbp|jpy)"
+
+# One alternation, one scan per document. It runs on the lowercased text with case-sensitive
+# literals so the regex engine can skip ahead on the first character; names and places are then
+# read from the original text at the same offsets. Each outer group names the fact it extracts.
+_FACT_RE = re.compile(
+    # revenue of $4.5 billion / revenue: us$ 4,500 million / sales reached €2bn
+    rf"(?P<revenue>(?:revenues?|sales|turnover)\b[^.$€£¥]{{0,40}}?(?P<rc1>{_CUR})\s?(?P<rn1>{_NUM})\s?(?P<ru1>{_UNIT})?)"
+    # $4.5 billion in revenue / $4.5b revenue
+    rf"|(?P<revenue_after>(?P<rc2>{_CUR})\s?(?P<rn2>{_NUM})\s?(?P<ru2>{_UNIT})?\s(?:in\s)?(?:annual\s)?(?:revenues?|sales)\b)"
+    # 7,400 employees / 7.4k full-time staff
+    rf"|(?P<employees>(?P<en1>{_NUM})\s?(?P<eu1>thousand|k)?\+?\s(?:full[- ]time\s)?(?:employees|staff|workers)\b)"
+    # employs 7,400 / workforce of 7,400 / employees: 7,400
+    rf"|(?P<employees_before>(?:employs|workforce of|employees:|number of employees:?|headcount:?)\s"
+    rf"(?:about\s|around\s|over\s|approximately\s)?(?P<en2>{_NUM})\s?(?P<eu2>(?:thousand|k)\b)?)"
+    # founded in april 2011 / established 1998
+    rf"|(?P<founded>(?:founded|established|incorporated)\b(?:\s(?:in|on))?(?:\s[a-z]+){{0,2}}?\s(?P<year>1[6-9]\d\d|20\d\d)\b)"
+    # headquartered in San Jose, California / headquarters: Austin
+    r"|(?P<headquarters>(?:headquartered in|headquarters(?: is| are)?(?: in|:)|based in)\s)"
+    # CEO Eric Yuan / chief executive officer: Jane Doe / Eric Yuan, the CEO
+    r"|(?P<ceo>(?:ceo|chief executive officer|chief executive)\b(?:\s(?:is|was))?[,:]?\s?)"
+)
+_NAME_RE = re.compile(r"[A-Z][a-z]+(?:[ \-][A-Z][a-zA-Z'\-]+){1,2}")
+_NAME_BEFORE_RE = re.compile(r"([A-Z][a-z]+(?:[ \-][A-Z][a-zA-Z'\-]+){1,2}),?\s(?:the\s)?$")
+# "St. Louis" keeps its abbreviation; a sentence-ending period never joins the next word
+_PLACE_RE = re.compile(r"(?:[A-Z][a-z]{0,2}\. )?[A-Z][\w\-]+(?: [A-Z][\w\-]+){0,3}")
+
+_FACT_TYPES = {
+    "revenue": "revenue", "revenue_after": "revenue",
+    "employees": "employees", "employees_before": "employees",
+    "founded": "founded", "headquarters": "headquarters", "ceo": "ceo",
+}
+NUMERIC_FACTS = ("revenue", "employees", "founded")
+# Words that find passages about each fact kind in a keyword (BM25) search
+TOPIC_TERMS = {
+    "revenue": ("revenue", "revenues", "sales", "turnover", "fiscal", "annual", "billion", "million"),
+    "employees": ("employees", "employs", "staff", "workforce", "headcount"),
+    "founded": ("founded", "established", "incorporated", "history"),
+    "headquarters": ("headquarters", "headquartered", "based"),
+    "ceo": ("ceo", "chief", "executive", "leadership"),
+}
+
+
+def _number(num, unit):
+    value = float(num.replace(",", ""))
+    return value * UNITS.get(unit or "", 1.0)
+
+
+def _display(kind, value):
+    if kind == "revenue":
+        for scale, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+            if value >= scale:
+                return f"${value / scale:.3g}{suffix}"
+        return f"${value:,.0f}"
+    if kind == "employees":
+        return f"{value:,.0f} employees"
+    return str(int(value)) if kind == "founded" else value
+
+
+def _ceo(text, m):
+    """Name right after "CEO", else right before ("Eric Yuan, CEO")."""
+    after = _NAME_RE.match(text, m.end())
+    if after:
+        return after.group()
+    before = _NAME_BEFORE_RE.search(text, max(0, m.start() - 60), m.start())
+    return before.group(1) if before else None
+
+
+def extract_facts(text):
+    """All typed facts in `text` as (kind, canonical value, matched text). Numbers are in USD / units."""
+    text = text or ""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        text = lowered   # rare Unicode case changes shift offsets; names just won't be found
+    facts = []
+    for m in _FACT_RE.finditer(lowered):
+        name = m.lastgroup
+        kind = _FACT_TYPES.get(name)
+        if name == "revenue":
+            value = _number(m.group("rn1"), m.group("ru1")) * USD_RATES[m.group("rc1")]
+        elif name == "revenue_after":
+            value = _number(m.group("rn2"), m.group("ru2")) * USD_RATES[m.group("rc2")]
+        elif name == "employees":
+            value = _number(m.group("en1"), m.group("eu1"))
+        elif name == "employees_before":
+            value = _number(m.group("en2"), m.group("eu2"))
+        elif name == "founded":
+            value = float(m.group("year"))
+        elif name == "headquarters":
+            place = _PLACE_RE.match(text, m.end())
+            if not place:
+                continue
+            # compare on the city: "San Jose, California" == "San Jose"
+            value = place.group().lower()
+        else:
+            person = _ceo(text, m)
+            if not person:
+                continue
+            value = " ".join(person.lower().split())
+        # a bare small number next to "revenue" is almost always a ranking or a percentage, not a figure
+        if kind == "revenue" and value < 1e5 or kind == "employees" and not 1 <= value < 5e6:
+            continue
+        facts.append((kind, value, text[m.start():m.end()]))
+    return facts
+
+
+def _clusters(kind, observations):
+    """Group (value, source) pairs: numeric values by relative tolerance, strings by exact key."""
+    if kind in NUMERIC_FACTS:
+        values = np.array([v for v, _ in observations], dtype=np.float64)
+        order = np.argsort(values)
+        logs = np.log(values[order])
+        # single-linkage on a log scale: a new cluster starts where the gap exceeds the tolerance
+        breaks = np.flatnonzero(np.diff(logs) > np.log1p(TOLERANCES[kind]) + 1e-9) + 1
+        groups = np.split(order, breaks)
+        return [[observations[i] for i in g] for g in groups]
+    by_key = {}
+    for value, source in observations:
+        key = value.split()[-1] if kind == "ceo" else value   # "Eric S. Yuan" == "Eric Yuan"
+        by_key.setdefault(key, []).append((value, source))
+    return list(by_key.values())
+
+
+def detect_conflicts(docs, min_score=CONFLICT_MIN_SCORE):
+    """Facts on which sources disagree, most contested first.
+
+    Returns {kind: [{"value", "sources", "support"}, ...]} for kinds whose disagreement score
+    (1 - share of sources backing the majority value) reaches `min_score`. A source that states
+    several values (e.g. revenue for two years) only counts where other sources disagree with it.
+    """
+    observations = {}
+    for doc in docs:
+        source = doc.get("url") or doc.get("title") or "source"
+        for kind, value, _ in extract_facts(doc.get("text") or ""):
+            observations.setdefault(kind, []).append((value, source))
+
+    scored = []
+    for kind, obs in observations.items():
+        if len({s for _, s in obs}) < 2:
+            continue
+        clusters = []
+        for group in _clusters(kind, obs):
+            sources = sorted({s for _, s in group})
+            values = [v for v, _ in group]
+            canonical = float(np.median(values)) if kind in NUMERIC_FACTS else max(set(values), key=values.count)
+            clusters.append({"value": _display(kind, canonical), "sources": sources, "support": len(sources)})
+        clusters.sort(key=lambda c: -c["support"])
+        if len(clusters) < 2:
+            continue
+        top = set(clusters[0]["sources"])
+        # only disagreement between different sources counts
+        rivals = [c for c in clusters[1:] if set(c["sources"]) - top]
+        if not rivals:
+            continue
+        total = clusters[0]["support"] + sum(c["support"] for c in rivals)
+        score = 1 - clusters[0]["support"] / total
+        if score >= min_score:
+            scored.append((score, kind, [clusters[0]] + rivals))
+
+    scored.sort(key=lambda t: -t[0])
+    return {kind: clusters for _, kind, clusters in scored}
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import re
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a chars/4 estimate
+    tiktoken = None
+
+# Prompt budget for retrieved context, per model (tokens). CONTEXT_TOKEN_BUDGET overrides.
+MODEL_CONTEXT_BUDGETS = {
+    "gpt-4o-mini": 6000,
+    "gpt-4o": 6000,
+    "gpt-4.1-mini": 6000,
+    "gpt-4-turbo": 6000,
+    "gpt-3.5-turbo": 2500,
+}
+DEFAULT_BUDGET = 4000
+
+# SimHash fingerprints closer than this many bits are treated as the same passage
+NEAR_DUP_BITS = int(os.getenv("CONTEXT_NEAR_DUP_BITS", "3"))
+
+_WORD_RE = re.compile(r"\w+")
+_encoders = {}
+
+
+def token_budget(model):
+    override = os.getenv("CONTEXT_TOKEN_BUDGET")
+    if override:
+        return int(override)
+    return MODEL_CONTEXT_BUDGETS.get(model, DEFAULT_BUDGET)
+
+
+def _encoder(model):
+    if tiktoken is None:
+        return None
+    if model not in _encoders:
+        try:
+            try:
+                enc = tiktoken.encoding_for_model(model)
+            except KeyError:
+                enc = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # e.g. BPE files can't be downloaded; estimate instead of failing the request
+            print("TOKENIZER ERROR:", e)
+            enc = None
+        _encoders[model] = enc
+    return _encoders[model]
+
+
+def count_tokens(text, model):
+    enc = _encoder(model)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def simhash(text, shingle=3):
+    """64-bit SimHash over word shingles; near-identical passages differ in only a few bits."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < shingle:
+        words = words + [""] * (shingle - len(words))
+    weights = [0] * 64
+    for i in range(len(words) - shingle + 1):
+        h = int.from_bytes(hashlib.blake2b(" ".join(words[i:i + shingle]).encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def _format(chunk):
+    title = chunk.get("title") or chunk.get("url") or "source"
+    label = f" | competitor: {chunk.get('subject')}" if chunk.get("competitor") else ""
+    return f"[{title} | {chunk.get('url', '')}{label}] \n{chunk.get('text', '')}"
+
+
+def build_context(chunks, model, budget=None):
+    """Pack the highest-scoring, non-duplicate chunks into the token budget.
+
+    Returns (context, used_chunks, stats) where stats has tokens, budget and duplicates.
+    """
+    budget = budget or token_budget(model)
+    ranked = sorted(enumerate(chunks), key=lambda ic: (-(ic[1].get("score") or 0.0), ic[0]))
+    sep_tokens = count_tokens("\n\n", model)
+
+    pieces, used, fingerprints = [], [], []
+    tokens = 0
+    duplicates = 0
+    for _, chunk in ranked:
+        text = chunk.get("text") or ""
+        if not text.strip():
+            continue
+        fp = simhash(text)
+        if any(bin(fp ^ seen).count("1") <= NEAR_DUP_BITS for seen in fingerprints):
+            duplicates += 1
+            continue
+        piece = _format(chunk)
+        cost = count_tokens(piece, model) + (sep_tokens if pieces else 0)
+        if tokens + cost > budget:
+            continue  # a smaller, lower-ranked chunk may still fit
+        fingerprints.append(fp)
+        pieces.append(piece)
+        used.append(chunk)
+        tokens += cost
+
+    return "\n\n".join(pieces), used, {"tokens": tokens, "budget": budget, "duplicates": duplicates}
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import math
+import os
+import re
+import time
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from scrape_cache import scrape_cache, normalize_url
+from scraper import HEADERS, fetch_text_async, scrape_many_async
+from singleflight import SingleFlight
+
+# Budgets per crawl
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "12"))      # documents handed to on_doc
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "2"))       # link hops from a seed
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "25"))        # seconds; no new fetches start after this
+# Seconds between requests to one host, unless robots.txt asks for more (capped at CRAWL_MAX_DELAY)
+CRAWL_DELAY = float(os.getenv("CRAWL_DELAY", "0.5"))
+CRAWL_MAX_DELAY = 5.0
+
+ROBOTS_TTL = 24 * 3600
+ROBOTS_ERROR_TTL = 15 * 60
+USER_AGENT = HEADERS["User-Agent"]
+
+# High-value pages for account research, best first. Matched against the path and the link text.
+PAGE_PRIORITIES = [
+    (re.compile(r"about|who-we-are|our-story|overview|company"), 10),
+    (re.compile(r"investor|\bir\b|annual-report|financ|earnings|results"), 9),
+    (re.compile(r"leadership|management|executive|board|founders|team"), 8),
+    (re.compile(r"press|news|media"), 7),
+    (re.compile(r"sitemap"), 6),
+    (re.compile(r"customer|case-stud|solution|product|platform|industr"), 5),
+    (re.compile(r"career|jobs"), 4),
+]
+# Extra weight for pages likely to settle a conflict on this fact (see conflict_detector)
+TOPIC_PAGES = {
+    "revenue": re.compile(r"investor|\bir\b|annual|financ|earnings|results|10-k"),
+    "employees": re.compile(r"career|jobs|about|company|culture"),
+    "founded": re.compile(r"about|history|story|company"),
+    "headquarters": re.compile(r"contact|about|location|office"),
+    "ceo": re.compile(r"leadership|management|executive|board|team"),
+}
+TOPIC_BOOST = 10
+SEED_PRIORITY = 100
+
+_SKIP_RE = re.compile(
+    r"\.(?:pdf|jpe?g|png|gif|svg|webp|ico|zip|gz|mp4|mp3|css|js|docx?|xlsx?|pptx?)$"
+    r"|/(?:login|signin|sign-in|signup|sign-up|cart|checkout|privacy|cookie|terms|legal)\b"
+)
+# /de/, /fr-fr/ ...: translated copies of pages we already rank
+_LOCALE_RE = re.compile(r"^/(?!en\b)[a-z]{2}(?:[-_][a-z]{2})?/")
+
+
+def canonical_url(url):
+    """De-duplication key: normalize_url without scheme or a leading www."""
+    url = normalize_url(url)
+    url = url.split("://", 1)[-1]
+    return url[4:] if url.startswith("www.") else url
+
+
+def _site(host):
+    host = (host or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; k positions by double hashing one blake2b digest."""
+
+    def __init__(self, capacity=10000, error_rate=0.01):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item):
+        """Add `item`; returns False if it was (probably) already present."""
+        new = False
+        for p in self._positions(item):
+            if not self.bits[p >> 3] & (1 << (p & 7)):
+                self.bits[p >> 3] |= 1 << (p & 7)
+                new = True
+        return new
+
+
+class RobotsCache:
+    """robots.txt per origin, fetched once and kept for ROBOTS_TTL."""
+
+    def __init__(self):
+        self._entries = {}   # origin -> (RobotFileParser, expires_at)
+        self._flight = SingleFlight()
+
+    async def get(self, url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}".lower()
+        entry = self._entries.get(origin)
+        if entry and entry[1] > time.time():
+            return entry[0]
+        parser, _ = await self._flight.do(origin, lambda: self._fetch(origin))
+        return parser
+
+    async def _fetch(self, origin):
+        status, text = await fetch_text_async(origin + "/robots.txt")
+        parser = RobotFileParser(origin + "/robots.txt")
+        ttl = ROBOTS_TTL
+        # same rules as RobotFileParser.read(): 401/403 block everything, other 4xx allow everything;
+        # an unreachable or failing server is treated as "disallow" for a short while (RFC 9309)
+        if status in (401, 403):
+            parser.disallow_all = True
+        elif status is None or status >= 500:
+            parser.disallow_all = True
+            ttl = ROBOTS_ERROR_TTL
+        elif status >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(text.splitlines())
+        self._entries[origin] = (parser, time.time() + ttl)
+        return parser
+
+
+class HostThrottle:
+    """Per-host politeness: requests to one host start at least `delay` seconds apart."""
+
+    def __init__(self):
+        self._next = {}   # host -> earliest monotonic time for the next request
+
+    async def wait(self, host, delay):
+        now = time.monotonic()
+        slot = max(now, self._next.get(host, 0.0))
+        self._next[host] = slot + delay
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# shared by every crawl so concurrent sessions stay polite to the same hosts
+robots_cache = RobotsCache()
+throttle = HostThrottle()
+
+
+def page_score(url, anchor="", topic=None):
+    """Frontier priority of a link: page type, topic match, and a penalty per path segment."""
+    path = urlsplit(url).path.lower()
+    haystack = path + " " + (anchor or "").lower()
+    score = 1
+    for pattern, value in PAGE_PRIORITIES:
+        if pattern.search(haystack):
+            score = value
+            break
+    boost = TOPIC_PAGES.get(topic)
+    if boost is not None and boost.search(haystack):
+        score += TOPIC_BOOST
+    if _LOCALE_RE.match(path):
+        score -= 5
+    return score - 0.5 * path.rstrip("/").count("/")
+
+
+class Crawler:
+    """Bounded best-first crawl: seeds first, then the highest-priority links on the expandable sites."""
+
+    def __init__(self, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH, concurrency=CRAWL_CONCURRENCY,
+                 topic=None, timeout=CRAWL_TIMEOUT):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.topic = topic
+        self.timeout = timeout
+        self.seen = BloomFilter(capacity=max(1000, 50 * max_pages))
+        self._frontier = []          # heap of (-score, seq, url, depth)
+        self._seq = itertools.count()
+        self.pages = 0               # documents handed to on_doc
+        self.fetched = 0             # every fetch, including sitemaps and known pages
+
+    def _push(self, url, depth, score):
+        if _SKIP_RE.search(urlsplit(url).path.lower()) or not self.seen.add(canonical_url(url)):
+            return
+        heapq.heappush(self._frontier, (-score, next(self._seq), url, depth))
+
+    async def _fetch(self, url):
+        robots = await robots_cache.get(url)
+        if not robots.can_fetch(USER_AGENT, url):
+            return None
+        # SQLite read + access-time write: keep it off the event loop
+        cached = await asyncio.to_thread(scrape_cache.get, url)
+        if cached and cached["fresh"]:
+            return dict(cached["doc"], url=url)
+        # only real network requests wait for the host's politeness slot
+        delay = min(CRAWL_MAX_DELAY, max(CRAWL_DELAY, robots.crawl_delay(USER_AGENT) or 0))
+        await throttle.wait(_site(urlsplit(url).hostname), delay)
+        results = await scrape_many_async([url], cached={url: cached})
+        return results[0] if results else None
+
+    async def _visit(self, url, depth):
+        return url, depth, await self._fetch(url)
+
+    async def crawl(self, seeds, on_doc, expand=(), known=()):
+        """Fetch `seeds`, then follow links on the sites of the `expand` urls; await on_doc(doc) per page.
+
+        Pages whose canonical url is in `known` are fetched for their links but not handed to on_doc.
+        Returns the number of documents delivered.
+        """
+        sites = {_site(urlsplit(u).hostname) for u in expand}
+        known = {canonical_url(u) for u in known}
+        for url in seeds:
+            self._push(url, 0, SEED_PRIORITY)
+        for url in expand if self.max_depth > 0 else ():
+            parts = urlsplit(url)
+            self._push(f"{parts.scheme}://{parts.netloc}/sitemap.xml", self.max_depth - 1, page_score("/sitemap.xml"))
+            robots = await robots_cache.get(url)
+            for sitemap in (robots.site_maps() or [])[:3]:
+                self._push(sitemap, self.max_depth - 1, page_score(sitemap))
+
+        deadline = time.monotonic() + self.timeout
+        fetch_budget = 3 * self.max_pages   # sitemaps, robots-blocked and empty pages cost a fetch too
+        while self._frontier and self.pages < self.max_pages and self.fetched < fetch_budget:
+            if time.monotonic() > deadline:
+                break
+            batch = []
+            while self._frontier and len(batch) < min(self.concurrency, self.max_pages - self.pages):
+                _, _, url, depth = heapq.heappop(self._frontier)
+                batch.append((url, depth))
+            self.fetched += len(batch)
+            # hand pages over as they arrive instead of waiting for the slowest one
+            for next_done in asyncio.as_completed([self._visit(url, depth) for url, depth in batch]):
+                url, depth, doc = await next_done
+                if not doc:
+                    continue
+                if depth < self.max_depth:
+                    for link, anchor in doc.get("links") or ():
+                        parts = urlsplit(link)
+                        host = _site(parts.hostname)
+                        if parts.scheme in ("http", "https") and any(host == s or host.endswith("." + s) for s in sites):
+                            self._push(link, depth + 1, page_score(link, anchor, self.topic))
+                if (doc.get("text") or "").strip() and canonical_url(url) not in known and self.pages < self.max_pages:
+                    self.pages += 1
+                    await on_doc(doc)
+        return self.pages
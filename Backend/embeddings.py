@@ -1,13 +1,191 @@
-import openai
+import base64
+import hashlib
 import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from dotenv import load_dotenv
+from openai import OpenAI
+
+from context_builder import count_tokens
+from scrape_cache import CACHE_DIR
+
 load_dotenv()
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
-from openai import OpenAI
-client = OpenAI()
+EMBEDDINGS_MODEL = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
+
+# Request limits: the API takes up to 2048 inputs / 300k tokens per call; stay well below both
+BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "100000"))
+BATCH_MAX_INPUTS = int(os.getenv("EMBED_BATCH_SIZE", "512"))
+CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+# Vector cache: one float32 memmap per model plus a SQLite index of content hash -> row
+CACHE_ENABLED = os.getenv("EMBED_CACHE", "true").lower() in ("1", "true", "yes")
+CACHE_PATH = os.getenv("EMBED_CACHE_DIR", os.path.join(CACHE_DIR, "embeddings"))
+
+_FILE_SAFE_RE = re.compile(r"[^\w.\-]")
+_pool = ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="embed")
+
+
+def content_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingStore:
+    """Vectors by (model, content hash). Rows are appended to <model>.f32 and read back through np.memmap.
+
+    Safe across processes sharing CACHE_DIR (several uvicorn workers): a writer allocates rows, writes the
+    file and indexes them inside one BEGIN IMMEDIATE transaction, and readers remap once the file has grown.
+    """
+
+    def __init__(self, directory=CACHE_PATH):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._maps = {}   # model -> read-only memmap of shape (rows, dim)
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, dim INTEGER, rows INTEGER)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (model TEXT, hash TEXT, row INTEGER, PRIMARY KEY (model, hash))"
+        )
+        self._db.commit()
+
+    def _path(self, model):
+        return os.path.join(self.directory, _FILE_SAFE_RE.sub("_", model) + ".f32")
+
+    def _map(self, model):
+        meta = self._db.execute("SELECT dim, rows FROM models WHERE model = ?", (model,)).fetchone()
+        if not meta or not meta[1]:
+            return None
+        vectors = self._maps.get(model)
+        if vectors is None or len(vectors) != meta[1]:
+            # first use, or another process appended rows since we mapped the file
+            vectors = np.memmap(self._path(model), dtype=np.float32, mode="r", shape=(meta[1], meta[0]))
+            self._maps[model] = vectors
+        return vectors
+
+    def get(self, model, keys):
+        """Cached vectors for `keys` as {key: (dim,) float32 array}; misses are left out."""
+        with self._lock:
+            rows = {}
+            for i in range(0, len(keys), 500):   # SQLite caps bound parameters per statement
+                part = keys[i:i + 500]
+                rows.update(self._db.execute(
+                    f"SELECT hash, row FROM vectors WHERE model = ? AND hash IN ({','.join('?' * len(part))})",
+                    (model, *part),
+                ).fetchall())
+            vectors = self._map(model) if rows else None
+            if vectors is None:
+                return {}
+            hits = [k for k, r in rows.items() if r < len(vectors)]
+            # fancy indexing copies the rows out, so callers never hold a view into the file
+            found = vectors[np.fromiter((rows[k] for k in hits), dtype=np.int64, count=len(hits))]
+        return dict(zip(hits, found))
+
+    def put(self, model, keys, vectors):
+        """Append vectors for `keys` (already de-duplicated) and index them."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            # the write lock on the index is held from reading the row count until the new rows are
+            # indexed, so no other process can be handed the same rows
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                meta = self._db.execute("SELECT dim, rows FROM models WHERE model = ?", (model,)).fetchone()
+                dim, start = meta if meta else (vectors.shape[1], 0)
+                if dim != vectors.shape[1]:
+                    print("EMBEDDING CACHE ERROR: dimension changed for", model)
+                    self._db.rollback()
+                    return
+                # release the mapping before growing the file (required on Windows)
+                self._maps.pop(model, None)
+                path = self._path(model)
+                with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                    # rows past the index (from an interrupted write) are simply overwritten
+                    f.seek(start * dim * 4)
+                    f.write(vectors.tobytes())
+                # a hash another process cached meanwhile keeps its row; ours just goes unused
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO vectors VALUES (?, ?, ?)",
+                    [(model, key, start + i) for i, key in enumerate(keys)],
+                )
+                self._db.execute("INSERT OR REPLACE INTO models VALUES (?, ?, ?)", (model, dim, start + len(keys)))
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+
+
+def _open_store():
+    if not CACHE_ENABLED:
+        return None
+    try:
+        return EmbeddingStore()
+    except (OSError, sqlite3.Error) as e:
+        print("EMBEDDING CACHE ERROR:", e)
+        return None
+
+
+embedding_store = _open_store()
+
+
+def _batches(texts, model):
+    """Index lists whose texts fit within BATCH_MAX_TOKENS / BATCH_MAX_INPUTS."""
+    batch, tokens = [], 0
+    for i, text in enumerate(texts):
+        n = count_tokens(text, model)
+        if batch and (tokens + n > BATCH_MAX_TOKENS or len(batch) >= BATCH_MAX_INPUTS):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(i)
+        tokens += n
+    if batch:
+        yield batch
+
+
+def _request(texts, model):
+    # base64 comes back as raw float32 bytes: decode straight into numpy, no per-float Python objects
+    res = client.embeddings.create(model=model, input=texts, encoding_format="base64")
+    data = sorted(res.data, key=lambda item: item.index)
+    return np.vstack([np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32) for item in data])
+
+
+def _fetch(texts, model):
+    batches = list(_batches(texts, model))
+    if len(batches) == 1:
+        return _request(texts, model)
+    results = _pool.map(lambda idx: _request([texts[i] for i in idx], model), batches)
+    out = None
+    for idx, vecs in zip(batches, results):
+        if out is None:
+            out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+        out[idx] = vecs
+    return out
+
+
+def embed_texts(texts, model=EMBEDDINGS_MODEL):
+    """Embed texts as an (n, dim) float32 array.
 
-def embed_texts(texts):
-    model = os.getenv("EMBEDDINGS_MODEL")
-    res = client.embeddings.create(model=model, input=texts)
-    return [item.embedding for item in res.data]
+    Identical texts are embedded once, cached vectors are reused, and the rest are fetched
+    in token-bounded batches that run concurrently.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    keys = [content_key(t) for t in texts]
+    unique = dict(zip(keys, texts))
+    found = embedding_store.get(model, list(unique)) if embedding_store else {}
+    missing = [k for k in unique if k not in found]
+    if missing:
+        vecs = _fetch([unique[k] for k in missing], model)
+        if embedding_store:
+            try:
+                embedding_store.put(model, missing, vecs)
+            except (OSError, sqlite3.Error) as e:
+                print("EMBEDDING CACHE ERROR:", e)
+        found.update(zip(missing, vecs))
+    return np.stack([found[k] for k in keys])
@@ -0,0 +1,242 @@
+import json
+import os
+from urllib.parse import urljoin
+
+try:
+    from lxml import etree
+except ImportError:  # optional: fall back to BeautifulSoup on the buffered page
+    etree = None
+
+# Stop parsing once this much main-content text has been collected
+MAX_TEXT_CHARS = int(os.getenv("SCRAPE_MAX_CHARS", "3000"))
+# Links kept per page for the crawler (<a href> in document order, sitemap <loc> entries)
+MAX_LINKS = int(os.getenv("SCRAPE_MAX_LINKS", "200"))
+
+CONTENT_TAGS = {"p", "li"}
+SKIP_TAGS = {"script", "style", "noscript", "template"}
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form"}
+ORG_TYPES = {"Organization", "Corporation", "Company", "NewsMediaOrganization", "OnlineBusiness"}
+
+DATE_META = (
+    "article:published_time", "og:published_time", "datepublished", "date",
+    "dc.date", "dc.date.issued", "article:modified_time", "og:updated_time",
+)
+
+
+def _clean(text):
+    return " ".join((text or "").split())
+
+
+def _organization(data):
+    """Find the first schema.org Organization in a JSON-LD payload (handles lists and @graph)."""
+    stack = [data]
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        types = node.get("@type")
+        types = set(types) if isinstance(types, list) else {types}
+        if types & ORG_TYPES:
+            employees = node.get("numberOfEmployees")
+            if isinstance(employees, dict):
+                employees = employees.get("value") or employees.get("maxValue")
+            address = node.get("address")
+            if isinstance(address, dict):
+                address = ", ".join(
+                    str(address[k]) for k in ("addressLocality", "addressRegion", "addressCountry")
+                    if isinstance(address.get(k), str)
+                )
+            founders = node.get("founder") or node.get("founders") or []
+            if not isinstance(founders, list):
+                founders = [founders]
+            org = {
+                "name": node.get("name"),
+                "url": node.get("url"),
+                "logo": node.get("logo") if isinstance(node.get("logo"), str) else None,
+                "founding_date": node.get("foundingDate"),
+                "employees": employees,
+                "address": address if isinstance(address, str) else None,
+                "founders": [f.get("name") if isinstance(f, dict) else f for f in founders],
+                "same_as": node.get("sameAs") or [],
+                "ticker": node.get("tickerSymbol"),
+            }
+            return {k: v for k, v in org.items() if v}
+        if "@graph" in node:
+            stack.append(node["@graph"])
+    return None
+
+
+class HTMLExtractor:
+    """Incremental extractor: feed() raw bytes as they arrive and stop once `done`.
+
+    Collects <p>/<li> text outside nav/header/footer boilerplate, plus title, meta
+    description, publish date, JSON-LD Organization data and outgoing links.
+    """
+
+    def __init__(self, url, encoding=None, max_chars=MAX_TEXT_CHARS):
+        self.url = url
+        self.max_chars = max_chars
+        self.title = ""
+        self.og_title = ""
+        self.description = ""
+        self.date = ""
+        self.organization = None
+        self.links = []     # [absolute url, anchor text]
+        self._pieces = []
+        self._chars = 0
+        self._buffer = []   # only used by the BeautifulSoup fallback
+        self._parser = None
+        if etree is not None:
+            self._parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding, remove_comments=True)
+
+    @property
+    def done(self):
+        return self._chars >= self.max_chars
+
+    def feed(self, chunk):
+        if self.done:
+            return
+        if self._parser is None:
+            self._buffer.append(chunk)
+            return
+        self._parser.feed(chunk)
+        self._drain()
+
+    def _add_text(self, el, text):
+        text = _clean(text)
+        if text and not any(isinstance(a.tag, str) and a.tag.lower() in BOILERPLATE_TAGS for a in el.iterancestors()):
+            self._pieces.append(text)
+            self._chars += len(text) + 1
+
+    def _flush_parent(self, el):
+        """A content block opens inside another (<li>a<p>b</p></li>): emit the outer block's text before it
+        and drop that text from the tree, so the output keeps document order ("a b", not "b a")."""
+        path = list(el.iterancestors())
+        parent = next((a for a in path if isinstance(a.tag, str) and a.tag.lower() in CONTENT_TAGS), None)
+        if parent is None:
+            return
+        parts = []
+        node = parent
+        # the parser may already be past `el`, so only take what precedes it
+        while node is not el:
+            parts.append(node.text or "")
+            node.text = None
+            for child in node:
+                if child is el or child in path:
+                    node = child
+                    break
+                parts.append("".join(child.itertext()) + (child.tail or ""))
+                for n in child.iter():
+                    n.text = n.tail = None
+        self._add_text(parent, "".join(parts))
+
+    def _drain(self):
+        for event, el in self._parser.read_events():
+            tag = el.tag if isinstance(el.tag, str) else ""
+            tag = tag.lower()
+            if event == "start":
+                if tag in CONTENT_TAGS:
+                    self._flush_parent(el)
+                continue
+            if tag in CONTENT_TAGS:
+                self._add_text(el, "".join(el.itertext()))
+                # nested <li>/<p> already captured; free the subtree
+                el.clear(keep_tail=True)
+            elif tag in SKIP_TAGS:
+                if tag == "script" and (el.get("type") or "").lower() == "application/ld+json":
+                    self._json_ld(el.text)
+                el.clear(keep_tail=True)
+            elif tag == "title" and not self.title:
+                self.title = _clean(el.text)
+            elif tag == "meta":
+                self._meta(el.get("name") or el.get("property") or el.get("itemprop") or "", el.get("content"))
+            elif tag == "time" and not self.date:
+                self.date = el.get("datetime") or ""
+            elif tag == "a":
+                self._link(el.get("href"), "".join(el.itertext()))
+            elif tag == "loc":
+                self._link(el.text, "")
+            if self.done:
+                break
+
+    def _meta(self, name, content):
+        name = name.lower()
+        content = _clean(content)
+        if not content:
+            return
+        if name in ("description", "og:description") and not self.description:
+            self.description = content
+        elif name == "og:title" and not self.og_title:
+            self.og_title = content
+        elif name in DATE_META and not self.date:
+            self.date = content
+
+    def _link(self, href, text):
+        href = (href or "").strip()
+        if not href or len(self.links) >= MAX_LINKS or href.startswith(("#", "mailto:", "javascript:", "tel:")):
+            return
+        self.links.append([urljoin(self.url, href), _clean(text)[:80]])
+
+    def _json_ld(self, raw):
+        try:
+            data = json.loads(raw or "")
+        except ValueError:
+            return
+        if self.organization is None:
+            self.organization = _organization(data)
+        if not self.date and isinstance(data, dict):
+            self.date = data.get("datePublished") or data.get("dateModified") or ""
+
+    def _fallback_parse(self):
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(b"".join(self._buffer), "html.parser")
+        for s in soup.find_all("script", type="application/ld+json"):
+            self._json_ld(s.string)
+        for s in soup(list(SKIP_TAGS)):
+            s.decompose()
+        if soup.title:
+            self.title = _clean(soup.title.get_text())
+        for m in soup.find_all("meta"):
+            self._meta(m.get("name") or m.get("property") or m.get("itemprop") or "", m.get("content"))
+        for a in soup.find_all("a", href=True):
+            self._link(a["href"], a.get_text(" "))
+        for loc in soup.find_all("loc"):
+            self._link(loc.get_text(), "")
+        for el in soup.find_all(list(CONTENT_TAGS)):
+            if el.find_parent(list(BOILERPLATE_TAGS)):
+                continue
+            text = _clean(el.get_text(" "))
+            if text:
+                self._pieces.append(text)
+                self._chars += len(text) + 1
+            if self.done:
+                break
+
+    def result(self):
+        if self._parser is None and self._buffer:
+            self._fallback_parse()
+        elif self._parser is not None and not self.done:
+            # flush elements still open at end of input
+            try:
+                self._parser.close()
+            except etree.LxmlError:
+                pass
+            self._drain()
+        text = " ".join(self._pieces)
+        if self.description and self.description not in text:
+            text = self.description + " " + text
+        doc = {
+            "url": self.url,
+            "title": self.og_title or self.title,
+            "text": text[:self.max_chars],
+            "description": self.description,
+            "date": self.date,
+        }
+        if self.organization:
+            doc["organization"] = self.organization
+        if self.links:
+            doc["links"] = self.links
+        return doc
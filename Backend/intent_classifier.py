@@ -0,0 +1,167 @@
+import re
+from typing import NamedTuple, Optional
+
+# Keyword tables: phrase -> label. Matching is case-insensitive, on word boundaries,
+# and ' also matches ’ so "don't" and "don’t" behave the same.
+INTENT_KEYWORDS = {
+    "confused": ["i don't know", "not sure", "help me figure", "no idea"],
+    "greeting": ["hello", "hi", "hey", "hlo"],
+    "smalltalk": ["who are you", "how are you", "what's up"],
+    "efficient": ["short", "brief", "quick", "tl;dr"],
+    "account_plan": ["account plan", "create", "generate", "research"],
+}
+PERSONA_KEYWORDS = {
+    "confused": ["don't know", "not sure", "help me", "i'm confused", "what should"],
+    "efficient": ["short", "quick", "tl;dr", "summary", "brief"],
+    "chatty": ["story", "so anyway", "by the way", "btw"],
+}
+FORMAT_KEYWORDS = {
+    "pitch": ["pitch", "investor", "one-pager"],
+    "short": ["short", "brief", "summary", "tl;dr"],
+    "bullets": ["bullet", "bullets", "list"],
+}
+KNOWN_COMPANIES = ["openai", "zoom", "tesla", "meta", "google", "nvidia", "microsoft"]
+
+# Highest priority first. An explicit plan request beats greeting/"quick" words:
+# "hi, create a short account plan for Zoom" is a plan request in short format.
+INTENT_ORDER = ("confused", "account_plan", "greeting", "smalltalk", "efficient")
+PERSONA_ORDER = ("confused", "efficient", "chatty")
+FORMAT_ORDER = ("pitch", "short", "bullets")
+
+CHATTY_INTENT_WORDS = 12
+CHATTY_PERSONA_WORDS = 30
+NOT_COMPANIES = {"me", "us", "that", "this", "a", "an", "the", "my"}
+NO_RANK = 99   # phrase implies no label in that category
+
+
+class Classification(NamedTuple):
+    intent: str
+    persona: str
+    format: str
+    company: str                 # best guess, never empty ("UnknownCompany" if nothing fits)
+    known_company: Optional[str]  # a KNOWN_COMPANIES hit, used for suggestions
+    candidates: tuple            # every company candidate, best first
+
+
+def _normalize(phrase):
+    return " ".join(phrase.lower().replace("’", "'").split())
+
+
+def _trie(phrases):
+    """Regex alternation factored by shared prefixes, so the engine never retries a common stem."""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def render(node):
+        alts = []
+        for ch, child in sorted(node.items()):
+            if ch:
+                char = "['’]" if ch == "'" else r"\s+" if ch == " " else re.escape(ch)
+                alts.append(char + render(child))
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            # the phrase may end here; trying the longer continuation first keeps longest-match
+            body = ("(?:" + body + ")" if len(alts) == 1 else body) + "?"
+        return body
+
+    return render(trie)
+
+
+def _build():
+    """Compile every keyword into one alternation and map each phrase to all the tags it implies."""
+    tags = {}
+    for category, table in (("intent", INTENT_KEYWORDS), ("persona", PERSONA_KEYWORDS), ("format", FORMAT_KEYWORDS)):
+        for label, phrases in table.items():
+            for phrase in phrases:
+                tags.setdefault(_normalize(phrase), set()).add((category, label))
+    for name in KNOWN_COMPANIES:
+        tags.setdefault(name, set()).add(("company", name))
+    # the regex takes the longest phrase at a position, so a phrase also carries the tags
+    # of any phrase nested inside it ("i don't know" implies "don't know")
+    for phrase in tags:
+        for other, other_tags in tags.items():
+            if other != phrase and re.search(rf"(?<!\w){re.escape(other)}(?!\w)", phrase):
+                tags[phrase] = tags[phrase] | other_tags
+    # "for <name>" only consumes "for", so a keyword right after it (e.g. a known company) still matches.
+    # classify() runs it on the lowercased message: case-sensitive matching is about twice as fast.
+    source = rf"\b(?:(?P<kw>{_trie(tags)})(?![\w\-])|for\s+(?=(?P<after_for>\w[\w&.'’\-]*)))"
+    return re.compile(source), re.compile(source, re.IGNORECASE), tags
+
+
+def _ranks(tags):
+    """Per phrase: best rank in INTENT_ORDER / PERSONA_ORDER / FORMAT_ORDER (NO_RANK if none) and its company."""
+    orders = {"intent": INTENT_ORDER, "persona": PERSONA_ORDER, "format": FORMAT_ORDER}
+    ranks = dict.fromkeys(orders, NO_RANK)
+    company = None
+    for category, label in tags:
+        if category == "company":
+            company = label
+        else:
+            ranks[category] = min(ranks[category], orders[category].index(label))
+    return ranks["intent"], ranks["persona"], ranks["format"], company
+
+
+_PATTERN, _PATTERN_ANY_CASE, _TAGS = _build()
+_RANKS = {phrase: _ranks(tags) for phrase, tags in _TAGS.items()}
+_NON_NAME_RE = re.compile(r"[^A-Za-z0-9\-]")
+
+
+def _clean_company(token):
+    return _NON_NAME_RE.sub("", token)
+
+
+def classify(message):
+    """Scan `message` once and return intent, persona, format and company candidates."""
+    message = message or ""
+    lowered = message.lower()
+    # offsets only line up when lowercasing kept the length (it doesn't for e.g. "İ")
+    text, pattern = (lowered, _PATTERN) if len(lowered) == len(message) else (message, _PATTERN_ANY_CASE)
+    intent_rank = persona_rank = format_rank = NO_RANK
+    companies = []
+    after_for = []
+    for m in pattern.finditer(text):
+        token = m.group("kw")
+        if token is not None:
+            i, p, f, company = _RANKS.get(token) or _RANKS[_normalize(token)]
+            intent_rank = min(intent_rank, i)
+            persona_rank = min(persona_rank, p)
+            format_rank = min(format_rank, f)
+            if company:
+                companies.append(company)
+        else:
+            start, end = m.span("after_for")
+            name = message[start:end]
+            if name.lower() not in NOT_COMPANIES:
+                after_for.append(_clean_company(name))
+
+    words = message.split()
+    if len(words) > CHATTY_INTENT_WORDS:
+        intent = "chatty"
+    else:
+        intent = INTENT_ORDER[intent_rank] if intent_rank < NO_RANK else "unknown"
+    if persona_rank < NO_RANK:
+        persona = PERSONA_ORDER[persona_rank]
+    else:
+        persona = "chatty" if len(words) > CHATTY_PERSONA_WORDS else "unknown"
+    out_format = FORMAT_ORDER[format_rank] if format_rank < NO_RANK else "detailed"
+
+    candidates = [c for c in after_for if c]
+    seen = {c.lower() for c in candidates}
+    candidates += [c for c in companies if c not in seen]
+    last = _clean_company(words[-1]) if words else ""
+    if last and last.lower() not in seen and last not in candidates:
+        candidates.append(last)
+    return Classification(
+        intent,
+        persona,
+        out_format,
+        candidates[0] if candidates else "UnknownCompany",
+        companies[0].capitalize() if companies else None,
+        tuple(candidates),
+    )
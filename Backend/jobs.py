@@ -0,0 +1,144 @@
+import asyncio
+import os
+import time
+import uuid
+
+from intent_classifier import classify
+from rate_limiter import current_priority, PRIORITY_BACKGROUND
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "32"))
+JOB_TTL = int(os.getenv("JOB_TTL", "3600"))   # how long finished jobs stay pollable
+
+# Required params per job kind (same as the synchronous /chat, /dig_deeper and /edit_section bodies)
+JOB_PARAMS = {
+    "plan": ("message",),
+    "dig_deeper": ("session_id", "topic"),
+    "edit": ("session_id", "section", "new_content"),
+}
+JOB_KINDS = tuple(JOB_PARAMS)
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity; callers should retry later."""
+
+
+class Job:
+    def __init__(self, kind, params, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.key = key
+        self.status = "queued"   # queued -> running -> done | failed
+        self.progress = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Bounded queue + worker pool for plan / dig-deeper / edit work."""
+
+    def __init__(self, agent, workers=JOB_WORKERS, max_queue=JOB_MAX_QUEUE, ttl=JOB_TTL):
+        self.agent = agent
+        self.workers = workers
+        self.ttl = ttl
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.jobs = {}        # job id -> Job
+        self.in_flight = {}   # dedup key -> Job (queued or running)
+        self._tasks = []
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _dedup_key(self, kind, params):
+        session_id = params.get("session_id") or "anon"
+        if kind == "plan":
+            classified = classify(params["message"])
+            company, _ = self.agent.resolve_company(params["message"], classified)
+            return (kind, session_id, company.lower(), classified.format)
+        if kind == "dig_deeper":
+            return (kind, session_id, params["topic"].lower())
+        return (kind, session_id, params["section"], params["new_content"])
+
+    def submit(self, kind, params):
+        """Enqueue a job. Returns (job, deduped); raises ValueError for bad params, QueueFull when at capacity."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        # new_content may legitimately be empty (clearing a field); the others may not
+        missing = [name for name in JOB_PARAMS[kind]
+                   if params.get(name) is None or (name != "new_content" and not str(params[name]).strip())]
+        if missing:
+            raise ValueError(f"Missing required field(s) for job kind '{kind}': {', '.join(missing)}")
+        self._prune()
+        key = self._dedup_key(kind, params)
+        existing = self.in_flight.get(key)
+        if existing is not None:
+            return existing, True
+
+        job = Job(kind, params, key)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFull("Job queue is full. Please retry shortly.")
+        self.jobs[job.id] = job
+        self.in_flight[key] = job
+        return job, False
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self.jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            # queued work yields to interactive /chat calls at the LLM rate limiter
+            current_priority.set(PRIORITY_BACKGROUND)
+            try:
+                job.result = await self._run(job)
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                self.in_flight.pop(job.key, None)
+                self.queue.task_done()
+
+    async def _run(self, job):
+        p = job.params
+
+        def on_event(kind, data):
+            if kind == "progress":
+                job.progress.append(data)
+
+        if job.kind == "plan":
+            return await self.agent.generate_plan(p["message"], p.get("session_id"), on_event=on_event)
+        if job.kind == "dig_deeper":
+            return await self.agent.dig_deeper(p["session_id"], p["topic"], on_event=on_event)
+        return await self.agent.edit_section(p["session_id"], p["section"], p["new_content"], on_event=on_event)
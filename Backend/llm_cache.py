@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from scrape_cache import CACHE_DIR
+
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+TTL = int(os.getenv("LLM_CACHE_TTL", str(6 * 3600)))
+# Disk tier is opt-in: set LLM_CACHE_DISK=true (or point LLM_CACHE_PATH somewhere)
+DISK_ENABLED = os.getenv("LLM_CACHE_DISK", "false").lower() in ("1", "true", "yes") or bool(os.getenv("LLM_CACHE_PATH"))
+DISK_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_cache.sqlite3"))
+
+
+def _canonical_content(content):
+    if not isinstance(content, str):
+        return content
+    lines = content.replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def make_key(model, messages, **params):
+    """Stable hash of the model, canonicalized messages and sampling parameters."""
+    payload = {
+        "model": model,
+        "messages": [{"role": m.get("role"), "content": _canonical_content(m.get("content"))} for m in messages],
+        "params": {k: v for k, v in sorted(params.items()) if v is not None},
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def cached_response(text, cached=True):
+    """Minimal stand-in for a chat completion so callers can keep using choices[0].message.content."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], cached=cached)
+
+
+class MemoryTier:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            text, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return text
+
+    def set(self, key, text):
+        with self._lock:
+            self._data[key] = (text, time.time() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteTier:
+    """On-disk tier so identical prompts stay cached across restarts and workers."""
+
+    def __init__(self, path=DISK_PATH, ttl=TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, text TEXT, expires_at REAL)")
+        self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT text, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key, text):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, text, time.time() + self.ttl)
+            )
+            self._db.commit()
+
+
+class LLMCache:
+    """Tiered response cache: checks each tier in order and back-fills faster tiers on a hit."""
+
+    def __init__(self, tiers=None):
+        if tiers is None:
+            tiers = [MemoryTier()]
+            if DISK_ENABLED:
+                tiers.append(SQLiteTier())
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        for i, tier in enumerate(self.tiers):
+            text = tier.get(key)
+            if text is not None:
+                for faster in self.tiers[:i]:
+                    faster.set(key, text)
+                self.hits += 1
+                return text
+        self.misses += 1
+        return None
+
+    def set(self, key, text):
+        if not text:
+            return
+        for tier in self.tiers:
+            tier.set(key, text)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "tiers": [type(t).__name__ for t in self.tiers],
+        }
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,103 @@
+import copy
+
+# Which plan sections must be refreshed when a given section is edited.
+# Keys are dot paths (most specific match wins); an empty list means the edit is a leaf
+# and is applied without calling the LLM at all.
+SECTION_DEPENDENCIES = {
+    "company_name": [],
+    "snapshot": ["market_opportunity", "ideal_customer_profile", "competitive_landscape", "recommended_next_steps"],
+    "snapshot.description": ["market_opportunity", "ideal_customer_profile"],
+    "snapshot.primary_products": ["market_opportunity", "ideal_customer_profile", "competitive_landscape"],
+    "snapshot.headquarters": [],
+    "snapshot.founded": [],
+    "snapshot.revenue_estimate": [],
+    "snapshot.employees_estimate": [],
+    "market_opportunity": ["ideal_customer_profile", "recommended_next_steps"],
+    "ideal_customer_profile": ["recommended_next_steps"],
+    "key_stakeholders": ["recommended_next_steps"],
+    "tech_stack": [],
+    "competitive_landscape": ["risks_and_assumptions", "recommended_next_steps"],
+    "risks_and_assumptions": ["recommended_next_steps"],
+    "recommended_next_steps": [],
+    "sources": [],
+    "confidence": [],
+}
+
+
+def dependents_of(section):
+    """Sections to regenerate after `section` changes (most specific dot-path match)."""
+    parts = section.split(".")
+    while parts:
+        key = ".".join(parts)
+        if key in SECTION_DEPENDENCIES:
+            return list(SECTION_DEPENDENCIES[key])
+        parts.pop()
+    return []
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _resolve(doc, pointer):
+    """Return (parent, last_token) for a JSON Pointer like /market_opportunity/growth_drivers/0."""
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid path: {pointer}")
+    tokens = [_unescape(t) for t in pointer[1:].split("/")]
+    parent = doc
+    for token in tokens[:-1]:
+        if isinstance(parent, list):
+            parent = parent[int(token)]
+        elif isinstance(parent, dict):
+            parent = parent.setdefault(token, {})
+        else:
+            raise PatchError(f"Cannot traverse into {pointer}")
+    return parent, tokens[-1]
+
+
+def apply_json_patch(doc, ops, allowed_roots):
+    """Apply add/replace/remove ops (RFC 6902 subset) to a copy of `doc`.
+
+    Ops whose path is outside `allowed_roots` are dropped, so the model cannot touch
+    sections the user's edit does not affect. Returns (new_doc, applied_paths).
+    """
+    out = copy.deepcopy(doc)
+    applied = []
+    for op in ops if isinstance(ops, list) else []:
+        if not isinstance(op, dict):
+            continue
+        path = op.get("path") or ""
+        root = _unescape(path[1:].split("/")[0]) if path.startswith("/") else ""
+        if root not in allowed_roots:
+            continue
+        try:
+            parent, token = _resolve(out, path)
+            kind = op.get("op")
+            if isinstance(parent, list):
+                if kind == "remove":
+                    del parent[int(token)]
+                elif token == "-":
+                    parent.append(op.get("value"))
+                elif kind == "add":
+                    parent.insert(int(token), op.get("value"))
+                elif kind == "replace":
+                    parent[int(token)] = op.get("value")
+                else:
+                    continue
+            elif isinstance(parent, dict):
+                if kind == "remove":
+                    parent.pop(token, None)
+                elif kind in ("add", "replace"):
+                    parent[token] = op.get("value")
+                else:
+                    continue
+            else:
+                continue
+        except (PatchError, ValueError, IndexError, KeyError, TypeError):
+            continue
+        applied.append(path)
+    return out, applied
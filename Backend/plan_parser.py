@@ -0,0 +1,259 @@
+import json
+import re
+from typing import Annotated, Any, List, Literal, Optional
+
+from pydantic import BeforeValidator, ConfigDict, ValidationError, create_model
+
+from prompts import ACCOUNT_PLAN_SCHEMA
+
+# ----------------- Model generated from ACCOUNT_PLAN_SCHEMA -----------------
+
+_NULLABLE_RE = re.compile(r"\bstring\s*\|\s*null\b")
+_STRING_RE = re.compile(r'(?<!")\bstring\b(?!")')
+
+
+def schema_template(schema_text=ACCOUNT_PLAN_SCHEMA):
+    """Turn the prompt's pseudo-JSON schema into a JSON template (types become marker strings)."""
+    body = schema_text[schema_text.index("{"):schema_text.rindex("}") + 1]
+    body = _NULLABLE_RE.sub('"string|null"', body)
+    body = _STRING_RE.sub('"string"', body)
+    return json.loads(body)
+
+
+def _to_str(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return json.dumps(value)
+
+
+def _to_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (str, dict)):
+        return [value]
+    return value
+
+
+LooseStr = Annotated[Optional[str], BeforeValidator(_to_str)]
+
+
+def _enum(values):
+    def _normalize(value):
+        if isinstance(value, str):
+            value = value.strip().lower()
+            if value in values:
+                return value
+        return values[0]
+    return Annotated[Literal[tuple(values)], BeforeValidator(_normalize)]
+
+
+def _field_type(spec, name):
+    """(type, default) for one template node."""
+    if isinstance(spec, dict):
+        model = build_model(spec, name)
+        return model, None
+    if isinstance(spec, list):
+        item_type, _ = _field_type(spec[0], name + "Item") if spec else (Any, None)
+        if spec and isinstance(spec[0], dict):
+            # a bare string where an object is expected becomes its first field
+            first = next(iter(spec[0]))
+            item_type = Annotated[item_type, BeforeValidator(lambda v: {first: v} if isinstance(v, str) else v)]
+        return Annotated[List[item_type], BeforeValidator(_to_list)], []
+    if spec in ("string", "string|null"):
+        return LooseStr, None
+    if isinstance(spec, str) and "|" in spec:
+        values = [v.strip() for v in spec.split("|")]
+        return _enum(values), values[0]
+    return Any, None
+
+
+def build_model(template, name="AccountPlan"):
+    """Lenient Pydantic model mirroring a schema template: every field optional, extras allowed."""
+    fields = {}
+    for key, spec in template.items():
+        typ, default = _field_type(spec, name + "".join(p.title() for p in key.split("_")))
+        if isinstance(spec, dict):
+            fields[key] = (Optional[typ], None)
+        else:
+            fields[key] = (typ, default)
+    return create_model(name, __config__=ConfigDict(extra="allow"), **fields)
+
+
+PLAN_TEMPLATE = schema_template()
+AccountPlan = build_model(PLAN_TEMPLATE)
+PLAN_SECTIONS = tuple(PLAN_TEMPLATE)
+
+
+def validate_plan(data):
+    """Validate/coerce a plan dict against AccountPlan; invalid fields fall back to their defaults."""
+    data = dict(data)
+    for _ in range(len(PLAN_SECTIONS) + 1):
+        try:
+            plan = AccountPlan.model_validate(data).model_dump()
+            break
+        except ValidationError as e:
+            bad = {err["loc"][0] for err in e.errors() if err["loc"]}
+            if not bad:
+                raise
+            for key in bad:
+                data.pop(key, None)
+    else:
+        plan = AccountPlan().model_dump()
+    # empty nested sections are more useful to the frontend than null
+    for key, spec in PLAN_TEMPLATE.items():
+        if isinstance(spec, dict) and plan.get(key) is None:
+            plan[key] = build_empty(spec)
+    return plan
+
+
+def build_empty(spec):
+    return {k: ([] if isinstance(v, list) else build_empty(v) if isinstance(v, dict) else None) for k, v in spec.items()}
+
+
+# ----------------- Local JSON repair -----------------
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+def _strip_fences(text):
+    return _FENCE_RE.sub("", (text or "").strip())
+
+
+class _Scanner:
+    """Tracks JSON structure (open brackets, strings, escapes) one character at a time."""
+
+    def __init__(self):
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.complete_at = None   # index just past the closing brace of the root object
+        self.pos = 0
+
+    def feed(self, text):
+        events = []   # indexes where a top-level member ended (comma or closing brace at depth 1)
+        for ch in text:
+            i = self.pos
+            self.pos += 1
+            if self.complete_at is not None:
+                continue
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self.stack.append("}")
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+            if ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                if self.stack and self.stack[-1] == ch:
+                    self.stack.pop()
+                if len(self.stack) == 0:
+                    self.complete_at = i + 1
+                    events.append(i)
+            elif ch == "," and len(self.stack) == 1:
+                events.append(i)
+        return events
+
+
+def repair_json(text):
+    """Best-effort fix of truncated or slightly malformed model JSON. Returns a string (may still be invalid)."""
+    text = _strip_fences(text)
+    start = text.find("{")
+    if start == -1:
+        return text
+    text = text[start:]
+    scanner = _Scanner()
+    scanner.feed(text)
+    if scanner.complete_at is not None:
+        text = text[:scanner.complete_at]
+    else:
+        if scanner.in_string:
+            if scanner.escape:
+                text = text[:-1]
+            text += '"'
+        text = text.rstrip()
+        # finish a literal cut mid-word (tr -> true, nu -> null)
+        text = re.sub(r"(?<=[:\[,\s])(t|tr|tru|f|fa|fal|fals|n|nu|nul)$",
+                      lambda m: next(w for w in ("true", "false", "null") if w.startswith(m.group(1))), text)
+        if scanner.stack[-1] == "}":
+            # inside an object a trailing string after { or , is a key whose value never arrived
+            text = re.sub(r'([{,])\s*"[^"\\]*"\s*:?\s*$', r"\1", text)
+        text = re.sub(r",\s*$", "", text)
+        text += "".join(reversed(scanner.stack))
+    # trailing commas and Python literals are common slips
+    text = re.sub(r",\s*([}\]])", r"\1", text)
+    text = re.sub(r"(?<=[:\[,\s])(None|True|False)(?=\s*[,}\]])",
+                  lambda m: {"None": "null", "True": "true", "False": "false"}[m.group(1)], text)
+    return text
+
+
+def parse_json(text):
+    """Parse a JSON object from a completion, repairing it locally if needed. Returns (obj or None, repaired)."""
+    clean = _strip_fences(text)
+    try:
+        obj = json.loads(clean)
+        return (obj if isinstance(obj, dict) else None), False
+    except ValueError:
+        pass
+    try:
+        obj = json.loads(repair_json(clean))
+    except ValueError:
+        return None, True
+    return (obj if isinstance(obj, dict) else None), True
+
+
+def parse_plan(text):
+    """Parse + validate an account plan. Returns (plan or None, status) with status ok | repaired | failed."""
+    obj, repaired = parse_json(text)
+    if obj is None:
+        return None, "failed"
+    return validate_plan(obj), "repaired" if repaired else "ok"
+
+
+class IncrementalPlanParser:
+    """Feed streamed tokens; validates each top-level section as soon as it is complete."""
+
+    def __init__(self, on_section=None):
+        self.text = ""
+        self.on_section = on_section
+        self.sections = {}   # section -> True if it validated
+        self._scanner = _Scanner()
+
+    def feed(self, delta):
+        self.text += delta
+        for end in self._scanner.feed(delta):
+            self._check_sections(end)
+
+    def _check_sections(self, end):
+        # only text before the member delimiter: the live tail would validate a half-streamed section
+        partial, _ = parse_json(self.text[:end])
+        if not partial:
+            return
+        for key, value in partial.items():
+            if key in self.sections or key not in PLAN_TEMPLATE:
+                continue
+            try:
+                AccountPlan.model_validate({key: value})
+                ok = True
+            except ValidationError:
+                ok = False
+            self.sections[key] = ok
+            if self.on_section:
+                self.on_section(key, ok)
+
+    def result(self):
+        return parse_plan(self.text)
@@ -55,5 +55,125 @@ Generate an accurate Account Plan following this schema:
 
 Rules:
 - If sources conflict, add a field "conflicts".
+- Context marked "competitor: <name>" describes that competitor, not {company}: use it only for competitive_landscape.
 - Keep the JSON clean and valid.
 """
+
+# Independent slices of ACCOUNT_PLAN_SCHEMA, generated concurrently in sectioned mode.
+# "sources" is filled locally from the scraped sources, so no group asks for it.
+SECTION_GROUPS = {
+    "snapshot": """
+{
+  "company_name": string,
+  "snapshot": {
+    "description": string,
+    "headquarters": string,
+    "founded": string,
+    "revenue_estimate": string,
+    "employees_estimate": string,
+    "primary_products": [string]
+  },
+  "tech_stack": [string]
+}
+""",
+    "market": """
+{
+  "market_opportunity": {
+    "segment": string,
+    "tams_sams_soms": string,
+    "growth_drivers": [string]
+  }
+}
+""",
+    "icp": """
+{
+  "ideal_customer_profile": {
+    "industry": string,
+    "company_size": string,
+    "revenues": string,
+    "geography": string
+  }
+}
+""",
+    "stakeholders": """
+{
+  "key_stakeholders": [
+    {"role": string, "name": string | null, "linkedin": string | null}
+  ]
+}
+""",
+    "competitive": """
+{
+  "competitive_landscape": [
+    {"competitor": string, "notes": string, "sources": [string]}
+  ],
+  "risks_and_assumptions": [string]
+}
+""",
+    "next_steps": """
+{
+  "recommended_next_steps": [string],
+  "confidence": "low | medium | high"
+}
+""",
+}
+
+SECTION_PROMPT = """
+Your role: You research companies and create account plans.
+
+Use ONLY the following context and user request.
+
+CONTEXT:
+{context}
+
+USER REQUEST:
+{request}
+
+TASK:
+Generate ONLY the following part of the Account Plan for {company}.
+Return ONLY a JSON object with this structure:
+{schema}
+
+Rules:
+- If sources conflict, add a field "conflicts".
+- Context marked "competitor: <name>" describes that competitor, not {company}: use it only for competitive_landscape.
+- Keep the JSON clean and valid.
+"""
+
+EDIT_PATCH_PROMPT = """
+The user edited the "{section}" part of an account plan. New value:
+{new_value}
+
+Current values of the sections that depend on it (JSON):
+{dependents}
+
+Company snapshot for reference (JSON):
+{snapshot}
+
+TASK:
+Update ONLY these sections so they stay consistent with the edit: {dependent_names}.
+Change only what the edit actually affects; leave everything else as is.
+Return ONLY a JSON object of the form {{"patch": [...]}} where the list is a JSON Patch (RFC 6902)
+using "replace", "add" or "remove" ops with paths like "/market_opportunity/segment".
+Return {{"patch": []}} if nothing needs to change.
+"""
+
+# Tone per classifier persona (a communication style, not a job role); "unknown" gets no instruction
+PERSONA_TONES = {
+    "confused": "The reader is unsure where to start: explain terms simply and make next steps concrete.",
+    "efficient": "The reader wants the gist fast: be terse and lead with the key facts.",
+    "chatty": "The reader enjoys context: a conversational tone and a little more explanation are welcome.",
+}
+
+PERSONA_PATCH_PROMPT = """
+Below is a general-purpose account plan for {company} (JSON):
+{plan}
+
+TASK:
+Adjust its wording to this tone: {tone}
+Reword only fields whose phrasing should change for that tone (e.g. next steps, risks, market notes).
+Do not invent new facts and do not touch company_name, sources or confidence.
+Return ONLY a JSON object of the form {{"patch": [...]}} where the list is a JSON Patch (RFC 6902)
+using "replace", "add" or "remove" ops with paths like "/recommended_next_steps".
+Return {{"patch": []}} if nothing needs to change.
+"""
@@ -0,0 +1,180 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import re
+import time
+
+# Default quotas per model (requests/min, tokens/min). LLM_RPM / LLM_TPM override.
+MODEL_LIMITS = {
+    "gpt-4o-mini": (500, 200_000),
+    "gpt-4o": (500, 30_000),
+    "gpt-4.1-mini": (500, 200_000),
+    "gpt-4-turbo": (500, 30_000),
+    "gpt-3.5-turbo": (3500, 200_000),
+}
+DEFAULT_LIMITS = (500, 60_000)
+
+# Lower number = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Priority for LLM calls made from the current task (background jobs set this)
+current_priority = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """Parse OpenAI reset values like '1s', '6m0s' or '20ms' into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNITS[u] for n, u in parts)
+
+
+def retry_after(headers):
+    """Seconds the server asked us to wait, from retry-after-ms / retry-after."""
+    if not headers:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+
+def backoff_delay(attempt, hint=None):
+    """Full-jitter exponential backoff so concurrent retries spread out instead of moving in lockstep."""
+    if hint:
+        return hint + random.uniform(0, min(hint, BACKOFF_BASE))
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class TokenBucket:
+    def __init__(self, capacity, per_second):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def wait_time(self, amount):
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.per_second
+
+    def consume(self, amount):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def refund(self, amount):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, remaining):
+        """Adopt the server's view of what is left when it is tighter than ours."""
+        self._refill()
+        if remaining is not None and remaining < self.level:
+            self.level = remaining
+
+
+class RateLimiter:
+    """Client-side scheduler for one model: RPM + TPM token buckets and a priority queue of waiters."""
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm, rpm / 60)
+        self.tokens = TokenBucket(tpm, tpm / 60)
+        self.paused_until = 0.0
+        self._waiters = []   # heap of [priority, seq, tokens, future]
+        self._seq = itertools.count()
+        self._pump_task = None
+
+    async def acquire(self, tokens, priority=PRIORITY_INTERACTIVE):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        heapq.heappush(self._waiters, [priority, next(self._seq), tokens, fut])
+        if self._pump_task is None or self._pump_task.done() or self._pump_task.get_loop() is not loop:
+            self._pump_task = asyncio.create_task(self._pump())
+        await fut
+
+    async def _pump(self):
+        # Serve waiters strictly by priority: lower-priority work never jumps the queue.
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            _, _, tokens, fut = self._waiters[0]
+            if fut.done() or fut.get_loop() is not loop:   # caller cancelled, or left over from an old loop
+                heapq.heappop(self._waiters)
+                continue
+            wait = max(
+                self.paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens),
+            )
+            if wait <= 0:
+                heapq.heappop(self._waiters)
+                self.requests.consume(1)
+                self.tokens.consume(tokens)
+                fut.set_result(None)
+                continue
+            # re-check periodically: a higher-priority caller may have arrived
+            await asyncio.sleep(min(wait, 0.5))
+
+    def release(self, reserved, used):
+        """Return unused tokens once the real usage is known."""
+        if used is not None and used < reserved:
+            self.tokens.refund(reserved - used)
+
+    def update_from_headers(self, headers):
+        if not headers:
+            return
+        def _int(name):
+            try:
+                return int(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            remaining = _int(f"x-ratelimit-remaining-{kind}")
+            bucket.sync(remaining)
+            if remaining == 0:
+                # quota exhausted server-side: nobody goes until it resets
+                self.pause(parse_duration(headers.get(f"x-ratelimit-reset-{kind}")) or 1.0)
+
+    def pause(self, seconds):
+        """Hold every waiter (not just the caller) after a 429 so the whole process backs off."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_limiters = {}
+
+
+def get_limiter(model):
+    limiter = _limiters.get(model)
+    if limiter is None:
+        rpm, tpm = MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+        rpm = int(os.getenv("LLM_RPM", rpm))
+        tpm = int(os.getenv("LLM_TPM", tpm))
+        limiter = _limiters[model] = RateLimiter(rpm, tpm)
+    return limiter
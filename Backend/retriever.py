@@ -1,11 +1,299 @@
-class Retriever:
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from ann_index import ExactIndex, load_index, maybe_promote
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from embeddings import embed_texts
+from scrape_cache import CACHE_DIR
+
+# Chunking / embedding knobs
+CHUNK_SIZE = 800        # characters per chunk
+CHUNK_OVERLAP = 100     # characters shared by neighbouring chunks
+# Each ranking (cosine, BM25) contributes this many candidates per result requested to the fusion
+FUSION_DEPTH = 4
+
+
+def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Split text into overlapping chunks, breaking on whitespace where possible."""
+    text = " ".join((text or "").split())
+    if not text:
+        return []
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start + size // 2, end)
+            if cut != -1:
+                end = cut
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [c for c in chunks if c]
+
+
+class _Namespace:
+    """Documents, vector index and BM25 index for one (session, company) partition."""
+
     def __init__(self):
-        self.docs = []
+        self.docs = []          # original documents, in insertion order
+        self.chunks = []        # one {"url", "title", "text"} per vector; ids are positions in this list
+        self.index = ExactIndex()   # L2-normalised vectors; becomes HNSW once large (ann_index.maybe_promote)
+        self.lexical = BM25Index()  # same chunk ids as self.index
+        self.nbytes = 0         # approximate memory held by this namespace
+
+    def append(self, chunks, vecs):
+        before = self.index.nbytes
+        self.index.add(vecs)
+        self.chunks.extend(chunks)
+        postings = self.lexical.add(c["text"] for c in chunks)
+        self.nbytes += self.index.nbytes - before + sum(len(c["text"]) for c in chunks) + postings
+
+
+def namespace_key(session_id, company=None):
+    """Partition key for the retriever: one namespace per session and company."""
+    return (session_id or "anon", (company or "").strip().lower())
+
+
+DEFAULT_NAMESPACE = namespace_key(None)
+
+# Upper bound on memory held by all namespaces; least recently used ones are evicted first
+MAX_BYTES = int(float(os.getenv("RETRIEVER_MAX_MB", "256")) * 1024 * 1024)
+# Save namespaces on shutdown and load them on startup; on by default when sessions outlive the process
+PERSIST = os.getenv("RETRIEVER_PERSIST", str(os.getenv("SESSION_BACKEND", "memory").lower() == "sqlite")).lower() in ("1", "true", "yes")
+PERSIST_PATH = os.getenv("RETRIEVER_PATH", os.path.join(CACHE_DIR, "retriever"))
+
+
+def _dirname(key):
+    return hashlib.sha1(json.dumps(list(key)).encode("utf-8")).hexdigest()[:20]
+
+
+class Retriever:
+    def __init__(self, max_bytes=MAX_BYTES, path=PERSIST_PATH if PERSIST else None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.namespaces = OrderedDict()   # namespace key -> _Namespace, in LRU order
+        self.by_session = {}              # session_id -> set of namespace keys
+        self.pinned = set()               # namespace keys the LRU cap never evicts
+        self.nbytes = 0
+        self._lock = threading.RLock()
+
+    def _embed(self, texts):
+        """Embed texts (batched and cached by embeddings.py); returns an (n, dim) L2-normalised float32 matrix."""
+        vecs = np.asarray(embed_texts(texts), dtype=np.float32)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vecs / norms
+
+    def _namespace(self, key, create=False):
+        with self._lock:
+            ns = self.namespaces.get(key)
+            if ns is None and create:
+                ns = self.namespaces[key] = _Namespace()
+                self.by_session.setdefault(key[0], set()).add(key)
+            if ns is not None:
+                self.namespaces.move_to_end(key)
+            return ns
+
+    def add(self, doc, namespace=DEFAULT_NAMESPACE):
+        self.add_many([doc], namespace)
+
+    def add_many(self, docs, namespace=DEFAULT_NAMESPACE):
+        """Chunk and embed documents, then append them to the namespace's index."""
+        with self._lock:
+            # look up (or create) and count in one critical section, so an eviction in between
+            # can't leave the bytes charged to a namespace that no longer exists
+            ns = self._namespace(namespace, create=True)
+            ns.docs.extend(docs)
+            added = sum(len(d.get("text") or "") for d in docs)
+            ns.nbytes += added
+            self.nbytes += added
+        new_chunks = []
+        for doc in docs:
+            # which company a page describes travels with its chunks (competitor pages share the namespace)
+            about = {k: doc[k] for k in ("subject", "competitor") if doc.get(k)}
+            for piece in chunk_text(doc.get("text", "")):
+                new_chunks.append({"url": doc.get("url", ""), "title": doc.get("title", ""), "text": piece, **about})
+        if not new_chunks:
+            return
+        try:
+            vecs = self._embed([c["text"] for c in new_chunks])
+        except Exception as e:
+            # docs stay available to get_top's insertion-order fallback
+            print("EMBEDDING ERROR:", e)
+            return
+        with self._lock:
+            if self.namespaces.get(namespace) is not ns:
+                return  # evicted while we were embedding
+            before = ns.nbytes
+            ns.append(new_chunks, vecs)
+            self.nbytes += ns.nbytes - before
+            self._enforce_cap(keep=namespace)
+            index = ns.index
+        self._promote(namespace, ns, index)
+
+    def _promote(self, namespace, ns, index):
+        # build the graph outside the lock; searches keep using the exact index meanwhile
+        ann = maybe_promote(index)
+        if ann is index:
+            return
+        with self._lock:
+            if self.namespaces.get(namespace) is not ns or ns.index is not index:
+                return
+            if len(index) > len(ann):
+                ann.add(index.matrix()[len(ann):])
+            ns.index = ann
+            ns.nbytes += ann.nbytes - index.nbytes
+            self.nbytes += ann.nbytes - index.nbytes
+
+    def get_top(self, k=5, query=None, namespace=DEFAULT_NAMESPACE, keywords=None, include_competitors=True):
+        """Top-k chunks for `query`, fusing cosine and BM25 rankings; without a query, the first k documents.
+
+        `keywords` replaces the query for the lexical side only (e.g. a conflict topic and its synonyms).
+        `include_competitors=False` leaves out pages crawled about the company's competitors.
+        """
+        ns = self._namespace(namespace)
+        if ns is None:
+            return []
+        with self._lock:
+            n = len(ns.chunks)
+            index, chunks = ns.index, ns.chunks
+        if not query or n == 0:
+            return [d for d in ns.docs if include_competitors or not d.get("competitor")][:k]
+        depth = min(n, k * FUSION_DEPTH)
+        rankings = []
+        lexical, _ = ns.lexical.search(keywords or query, depth, limit=n)
+        if len(lexical):
+            rankings.append(lexical)
+        try:
+            q = self._embed([query])[0]
+        except Exception as e:
+            print("EMBEDDING ERROR:", e)
+        else:
+            rankings.append(index.search(q, depth, limit=n))
+        if not rankings:
+            return [d for d in ns.docs if include_competitors or not d.get("competitor")][:k]
+        fused = reciprocal_rank_fusion(rankings)
+        if not include_competitors:
+            fused = [(i, score) for i, score in fused if not chunks[i].get("competitor")]
+        return [dict(chunks[i], score=score) for i, score in fused[:k]]
+
+    def clone_namespace(self, source, target):
+        """Copy one namespace's documents and vectors into another without re-embedding."""
+        with self._lock:
+            src = self.namespaces.get(source)
+            if src is None or source == target:
+                return False
+            self.evict(target)
+            ns = self._namespace(target, create=True)
+            ns.docs = list(src.docs)
+            ns.chunks = list(src.chunks)
+            ns.index = src.index.copy()
+            ns.lexical.add(c["text"] for c in ns.chunks)
+            ns.nbytes = src.nbytes
+            self.nbytes += ns.nbytes
+            self._enforce_cap(keep=target)
+            return True
+
+    # ----------------- Eviction -----------------
+    def evict(self, namespace):
+        with self._lock:
+            ns = self.namespaces.pop(namespace, None)
+            self._forget(namespace)
+            if ns is None:
+                return
+            self.nbytes -= ns.nbytes
+            keys = self.by_session.get(namespace[0])
+            if keys is not None:
+                keys.discard(namespace)
+                if not keys:
+                    del self.by_session[namespace[0]]
+
+    def evict_session(self, session_id):
+        """Drop every namespace belonging to a session (e.g. on /reset)."""
+        with self._lock:
+            for key in list(self.by_session.get(session_id or "anon", ())):
+                self.evict(key)
+
+    def pin(self, namespace):
+        """Exempt a namespace from LRU eviction; it can still be evicted explicitly."""
+        with self._lock:
+            self.pinned.add(namespace)
+
+    def _enforce_cap(self, keep=None):
+        while self.nbytes > self.max_bytes:
+            oldest = next((k for k in self.namespaces if k != keep and k not in self.pinned), None)
+            if oldest is None:
+                return
+            self.evict(oldest)
+
+    # ----------------- Persistence -----------------
+    def _forget(self, namespace):
+        if self.path:
+            shutil.rmtree(os.path.join(self.path, _dirname(namespace)), ignore_errors=True)
+
+    def save(self):
+        """Write every namespace (docs, chunks, vector index) under self.path; BM25 is rebuilt on load."""
+        if not self.path:
+            return 0
+        with self._lock:
+            items = list(self.namespaces.items())
+        saved = 0
+        for key, ns in items:
+            folder = os.path.join(self.path, _dirname(key))
+            try:
+                os.makedirs(folder, exist_ok=True)
+                # hold the lock so the saved index and chunk list describe the same rows
+                with self._lock:
+                    meta = {"key": list(key), "index": ns.index.kind, "docs": ns.docs, "chunks": ns.chunks,
+                            "vectors": len(ns.index)}
+                    if len(ns.index):
+                        ns.index.save(os.path.join(folder, "vectors"))
+                    with open(os.path.join(folder, "meta.json"), "w", encoding="utf-8") as f:
+                        json.dump(meta, f, ensure_ascii=False)
+                saved += 1
+            except (OSError, TypeError, RuntimeError) as e:
+                print("RETRIEVER SAVE ERROR:", e)
+        return saved
 
-    def add(self, doc):
-        self.docs.append(doc)
+    def load(self):
+        """Restore namespaces saved by save(); vectors are read back, not re-embedded."""
+        if not self.path or not os.path.isdir(self.path):
+            return 0
+        loaded = 0
+        for name in sorted(os.listdir(self.path)):
+            folder = os.path.join(self.path, name)
+            try:
+                with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+                ns = _Namespace()
+                ns.docs = meta["docs"]
+                if meta.get("vectors"):
+                    ns.index = load_index(meta["index"], os.path.join(folder, "vectors"))
+                    ns.chunks = meta["chunks"]
+                    ns.lexical.add(c["text"] for c in ns.chunks)
+                ns.nbytes = (sum(len(d.get("text") or "") for d in ns.docs) + ns.index.nbytes
+                             + sum(len(c["text"]) for c in ns.chunks) + ns.lexical.nbytes)
+            except (OSError, ValueError, KeyError, RuntimeError) as e:
+                print("RETRIEVER LOAD ERROR:", e)
+                continue
+            key = tuple(meta["key"])
+            with self._lock:
+                if key in self.namespaces:
+                    continue
+                self.namespaces[key] = ns
+                self.by_session.setdefault(key[0], set()).add(key)
+                self.nbytes += ns.nbytes
+                loaded += 1
+        with self._lock:
+            self._enforce_cap()
+        return loaded
 
-    def get_top(self, k=5):
-        return self.docs[:k]
 
 retriever = Retriever()
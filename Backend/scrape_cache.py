@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+CACHE_PATH = os.getenv("SCRAPE_CACHE_PATH", os.path.join(CACHE_DIR, "scrape_cache.sqlite3"))
+MAX_BYTES = int(float(os.getenv("SCRAPE_CACHE_MAX_MB", "200")) * 1024 * 1024)
+
+# Freshness windows (seconds). Hosts not listed use DEFAULT_TTL.
+DEFAULT_TTL = int(os.getenv("SCRAPE_CACHE_TTL", str(24 * 3600)))
+NEGATIVE_TTL = int(os.getenv("SCRAPE_CACHE_NEGATIVE_TTL", "900"))
+DOMAIN_TTLS = {
+    "en.wikipedia.org": 7 * 24 * 3600,
+    "www.google.com": 3600,
+    "news.google.com": 15 * 60,
+}
+
+_TRACKING_PARAMS = ("utm_", "gclid", "fbclid")
+
+
+def normalize_url(url):
+    """Canonical form used as the cache key: lowercase host, no fragment/tracking params, sorted query."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def ttl_for(url):
+    host = (urlsplit(url).hostname or "").lower()
+    return DOMAIN_TTLS.get(host, DEFAULT_TTL)
+
+
+class ScrapeCache:
+    """SQLite-backed page cache: compressed documents keyed by a hash of the normalized URL."""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT, body BLOB,"
+            " size INTEGER, fetched_at REAL, expires_at REAL, accessed_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages(accessed_at)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS failed_hosts (host TEXT PRIMARY KEY, error TEXT, expires_at REAL)")
+        self._db.commit()
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def get(self, url):
+        """Return {"doc", "etag", "last_modified", "fresh"} for a cached page, or None."""
+        key = self._key(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, body, expires_at FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        etag, last_modified, body, expires_at = row
+        return {
+            "doc": json.loads(zlib.decompress(body)),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": expires_at > now,
+        }
+
+    def put(self, url, doc, etag=None, last_modified=None):
+        body = zlib.compress(json.dumps(doc, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(url), url, etag, last_modified, body, len(body), now, now + ttl_for(url), now),
+            )
+            self._db.commit()
+            self._evict()
+
+    def touch(self, url):
+        """Extend freshness after a 304 Not Modified revalidation."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET fetched_at = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now + ttl_for(url), now, self._key(url)),
+            )
+            self._db.commit()
+
+    # ----------------- Negative cache -----------------
+    def mark_failed(self, url, error=""):
+        """Skip `url`'s whole host for NEGATIVE_TTL. Only for host-level failures (DNS, refused, connect timeout)."""
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO failed_hosts VALUES (?, ?, ?)",
+                (host, str(error)[:200], time.time() + NEGATIVE_TTL),
+            )
+            self._db.commit()
+
+    def is_failed(self, url):
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            row = self._db.execute("SELECT expires_at FROM failed_hosts WHERE host = ?", (host,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    # ----------------- Eviction -----------------
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # drop least recently accessed pages until we are back under 90% of the cap
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM pages ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._db.executemany("DELETE FROM pages WHERE key = ?", victims)
+        self._db.execute("DELETE FROM failed_hosts WHERE expires_at < ?", (time.time(),))
+        self._db.commit()
+
+
+scrape_cache = ScrapeCache()
@@ -1,18 +1,208 @@
+import asyncio
+import codecs
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+import httpx
 import requests
-from bs4 import BeautifulSoup
+
+from extractor import HTMLExtractor
+from scrape_cache import scrape_cache, normalize_url
+from singleflight import SingleFlight
+
+HEADERS = {"User-Agent": "ResearchAgent/1.0"}
+TIMEOUT = 8
+
+# Concurrency caps for the async engine (global and per host)
+MAX_CONCURRENCY = int(os.getenv("SCRAPE_MAX_CONCURRENCY", "16"))
+PER_HOST_CONCURRENCY = int(os.getenv("SCRAPE_PER_HOST_CONCURRENCY", "2"))
+# Never download more than this per page; extraction usually stops well before
+MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(1536 * 1024)))
+CHUNK_BYTES = 16 * 1024
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:\-]+)""", re.IGNORECASE)
+
+
+def _encoding(charset, head):
+    """Header charset, else a <meta charset> in the first bytes, else utf-8 (libxml2 would guess latin-1)."""
+    if not charset:
+        match = _META_CHARSET_RE.search(head[:4096])
+        charset = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return "utf-8"
+
 
 def scrape_url(url):
     try:
-        headers = {"User-Agent": "ResearchAgent/1.0"}
-        r = requests.get(url, headers=headers, timeout=8)
-        html = r.text
+        with requests.get(url, headers=HEADERS, timeout=TIMEOUT, stream=True) as r:
+            chunks = r.iter_content(CHUNK_BYTES)
+            first = next(chunks, b"")
+            charset = r.encoding if "charset" in r.headers.get("content-type", "") else None
+            ex = HTMLExtractor(url, encoding=_encoding(charset, first))
+            ex.feed(first)
+            received = len(first)
+            for chunk in chunks:
+                if ex.done or received >= MAX_BYTES:
+                    break
+                ex.feed(chunk)
+                received += len(chunk)
+            return ex.result()
+    except:
+        return {"url": url, "text": ""}
 
-        soup = BeautifulSoup(html, "html.parser")
-        for s in soup(["script", "style", "noscript"]):
-            s.decompose()
 
-        text = " ".join(p.get_text(strip=True) for p in soup.find_all(["p", "li"]))
+# ----------------- Async engine -----------------
+# All async scraping runs on one dedicated event loop thread so the pooled
+# httpx client (and its keep-alive connections) can be shared by every caller,
+# whether it is sync code or a coroutine running on another loop.
+_loop = None
+_loop_lock = threading.Lock()
+_client = None
+_global_sem = None
+_host_sems = {}
+_flight = SingleFlight()
 
-        return {"url": url, "text": text[:3000]}
-    except:
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="scraper-loop", daemon=True).start()
+        return _loop
+
+
+def _get_client():
+    global _client, _global_sem
+    if _client is None:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY),
+        )
+        _global_sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _client
+
+
+def _host_sem(url):
+    host = urlsplit(url).netloc.lower()
+    sem = _host_sems.get(host)
+    if sem is None:
+        sem = _host_sems[host] = asyncio.Semaphore(PER_HOST_CONCURRENCY)
+    return sem
+
+
+_UNSET = object()
+
+
+async def _scrape_one(url, cached=_UNSET):
+    """Fetch and extract one page through the scrape cache. `cached` is a scrape_cache.get result
+    the caller already has (None for a miss), so the lookup isn't repeated here."""
+    if cached is _UNSET:
+        cached = scrape_cache.get(url)
+    if cached and cached["fresh"]:
+        return dict(cached["doc"], url=url)
+    if scrape_cache.is_failed(url):
+        # host unreachable recently; don't spend another timeout on it, but serve what we have
+        return dict(cached["doc"], url=url) if cached else {"url": url, "text": ""}
+
+    # stale entry: revalidate instead of re-downloading
+    headers = {}
+    if cached and cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached["last_modified"]:
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    client = _get_client()
+    try:
+        async with _global_sem, _host_sem(url):
+            async with client.stream("GET", url, headers=headers) as r:
+                if r.status_code == 304 and cached:
+                    scrape_cache.touch(url)
+                    return dict(cached["doc"], url=url)
+                if r.status_code >= 400:
+                    # an error page is not a source; a server error shouldn't hide what we had, though
+                    if cached and r.status_code >= 500:
+                        return dict(cached["doc"], url=url)
+                    return {"url": url, "text": "", "status": r.status_code}
+                # parse while downloading and hang up once we have enough text
+                chunks = r.aiter_bytes(CHUNK_BYTES)
+                first = await anext(chunks, b"")
+                ex = HTMLExtractor(url, encoding=_encoding(r.charset_encoding, first))
+                ex.feed(first)
+                received = len(first)
+                async for chunk in chunks:
+                    if ex.done or received >= MAX_BYTES:
+                        break
+                    ex.feed(chunk)
+                    received += len(chunk)
+                etag, last_modified = r.headers.get("etag"), r.headers.get("last-modified")
+        doc = ex.result()
+    except httpx.TransportError as e:
+        # a slow or dropped page says nothing about the rest of the site; only unreachable hosts are skipped
+        if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+            scrape_cache.mark_failed(url, e)
+        return dict(cached["doc"], url=url) if cached else {"url": url, "text": ""}
+    except Exception:
         return {"url": url, "text": ""}
+
+    scrape_cache.put(url, doc, etag, last_modified)
+    return doc
+
+
+async def _scrape_shared(url, cached=_UNSET):
+    # concurrent requests for the same page (across sessions) share one fetch
+    doc, _ = await _flight.do(normalize_url(url), lambda: _scrape_one(url, cached))
+    return dict(doc, url=url)
+
+
+async def _scrape_all(urls, cached=None):
+    cached = cached or {}
+    return await asyncio.gather(*(_scrape_shared(u, cached.get(u, _UNSET)) for u in urls))
+
+
+def scrape_many(urls):
+    """Scrape all urls concurrently. Results keep the order of `urls`."""
+    if not urls:
+        return []
+    future = asyncio.run_coroutine_threadsafe(_scrape_all(list(urls)), _get_loop())
+    return future.result()
+
+
+
+async def scrape_many_async(urls, cached=None):
+    """Awaitable version of scrape_many, usable from any event loop.
+
+    `cached` maps urls to scrape_cache.get results the caller already looked up.
+    """
+    if not urls:
+        return []
+    future = asyncio.run_coroutine_threadsafe(_scrape_all(list(urls), cached), _get_loop())
+    return await asyncio.wrap_future(future)
+
+
+async def _fetch_text(url, max_bytes):
+    client = _get_client()
+    try:
+        async with _global_sem, _host_sem(url):
+            async with client.stream("GET", url) as r:
+                body = bytearray()
+                async for chunk in r.aiter_bytes(CHUNK_BYTES):
+                    body += chunk
+                    if len(body) >= max_bytes:
+                        break
+                return r.status_code, bytes(body[:max_bytes]).decode(r.encoding or "utf-8", errors="replace")
+    except Exception as e:
+        print("FETCH ERROR:", url, e)
+        return None, ""
+
+
+async def fetch_text_async(url, max_bytes=512 * 1024):
+    """Raw text of a small resource (e.g. robots.txt) as (status, text); status is None on network errors."""
+    future = asyncio.run_coroutine_threadsafe(_fetch_text(url, max_bytes), _get_loop())
+    return await asyncio.wrap_future(future)
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from scrape_cache import CACHE_DIR
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()   # "memory" | "sqlite"
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(24 * 3600)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(CACHE_DIR, "sessions.sqlite3"))
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(blob):
+    if orjson is not None:
+        return orjson.loads(blob)
+    return json.loads(blob)
+
+
+class SessionStore:
+    """Session state keyed by session_id.
+
+    get() always returns a fresh dict; changes are only kept once written back
+    with set() or update(), so every backend behaves the same way.
+    Async code uses the a* variants, which keep blocking backends off the event loop.
+    """
+
+    def get(self, session_id):
+        raise NotImplementedError
+
+    def set(self, session_id, data):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def update(self, session_id, changes=None, remove=()):
+        """Merge `changes` into the session and drop the `remove` keys."""
+        data = self.get(session_id)
+        if data is None:
+            if not changes:
+                return None
+            data = {}
+        data.update(changes or {})
+        for key in remove:
+            data.pop(key, None)
+        self.set(session_id, data)
+        return data
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    # ----------------- Async API -----------------
+    async def aget(self, session_id):
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def aset(self, session_id, data):
+        return await asyncio.to_thread(self.set, session_id, data)
+
+    async def aupdate(self, session_id, changes=None, remove=()):
+        return await asyncio.to_thread(self.update, session_id, changes, remove)
+
+    async def adelete(self, session_id):
+        return await asyncio.to_thread(self.delete, session_id)
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process LRU with idle TTL; values are kept serialized so memory stays compact."""
+
+    def __init__(self, max_entries=SESSION_MAX_ENTRIES, ttl=SESSION_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()   # session_id -> (blob, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            item = self._data.get(session_id)
+            if item is None:
+                return None
+            blob, expires_at = item
+            if expires_at < time.time():
+                del self._data[session_id]
+                return None
+            self._data.move_to_end(session_id)
+        return loads(blob)
+
+    def set(self, session_id, data):
+        blob = dumps(data)
+        with self._lock:
+            self._data[session_id] = (blob, time.time() + self.ttl)
+            self._data.move_to_end(session_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._data.pop(session_id, None) is not None
+
+    # in-memory operations never wait on I/O: a thread hop would only add latency
+    async def aget(self, session_id):
+        return self.get(session_id)
+
+    async def aset(self, session_id, data):
+        return self.set(session_id, data)
+
+    async def aupdate(self, session_id, changes=None, remove=()):
+        return self.update(session_id, changes, remove)
+
+    async def adelete(self, session_id):
+        return self.delete(session_id)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Shared store for multiple uvicorn workers (WAL lets readers and one writer overlap)."""
+
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB, expires_at REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions(expires_at)")
+        self._db.commit()
+        self._writes = 0
+
+    def get(self, session_id):
+        with self._lock:
+            row = self._db.execute("SELECT data, expires_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return loads(row[0])
+
+    def set(self, session_id, data):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (session_id, dumps(data), now + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._db.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+            self._db.commit()
+
+    def delete(self, session_id):
+        with self._lock:
+            cur = self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.commit()
+        return cur.rowcount > 0
+
+
+def create_session_store(backend=SESSION_BACKEND):
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    return MemorySessionStore()
@@ -0,0 +1,31 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight task.
+
+    The work runs as its own task, so a caller that is cancelled (e.g. a client
+    disconnecting) does not cancel the result everyone else is waiting on.
+    """
+
+    def __init__(self):
+        self._calls = {}   # key -> asyncio.Task
+
+    async def do(self, key, fn):
+        """Await `fn()` once per key. Returns (result, shared) where shared is True for followers."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved so an unawaited failure doesn't log a warning
+
+    def __len__(self):
+        return len(self._calls)
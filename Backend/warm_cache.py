@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import time
+
+from competitor_graph import canonical
+from intent_classifier import KNOWN_COMPANIES, CHATTY_INTENT_WORDS
+from rate_limiter import current_priority, PRIORITY_BACKGROUND
+from retriever import retriever, namespace_key
+from scrape_cache import CACHE_DIR
+
+# Opt-in: every refresh is a full crawl plus LLM run paid for in the background
+WARM_ENABLED = os.getenv("WARM_CACHE", "false").lower() in ("1", "true", "yes")
+# Companies eligible for warming; WARM_COMPANIES="Zoom,Tesla,..." overrides
+HOT_COMPANIES = [c.strip() for c in os.getenv("WARM_COMPANIES", ",".join(KNOWN_COMPANIES)).split(",") if c.strip()]
+# Of those, only companies someone asked about within WARM_RECENT seconds are kept warm
+WARM_RECENT = int(os.getenv("WARM_RECENT", str(24 * 3600)))
+# A baseline is fresh for WARM_TTL; after that it is still served (and refreshed in the background) up to WARM_MAX_STALE
+WARM_TTL = int(os.getenv("WARM_TTL", str(12 * 3600)))
+WARM_MAX_STALE = int(os.getenv("WARM_MAX_STALE", str(7 * 24 * 3600)))
+WARM_CHECK_INTERVAL = int(os.getenv("WARM_CHECK_INTERVAL", "600"))   # seconds between scheduler passes
+WARM_PATH = os.getenv("WARM_CACHE_PATH", os.path.join(CACHE_DIR, "warm_plans.json"))
+
+# Retriever sessions holding the baseline's documents; a refresh builds into the staging one and swaps
+WARM_SESSION = "__warm__"
+STAGING_SESSION = "__warm_refresh__"
+BASELINE_PERSONA = "unknown"
+BASELINE_FORMAT = "detailed"
+
+
+class WarmCache:
+    """Precomputed research (crawled docs, embeddings, baseline plan) for hot companies.
+
+    Served stale-while-revalidate: get() returns any baseline younger than WARM_MAX_STALE and
+    schedules a background rebuild once it is older than WARM_TTL.
+    """
+
+    def __init__(self, agent, companies=HOT_COMPANIES, path=WARM_PATH, enabled=WARM_ENABLED):
+        self.agent = agent
+        self.companies = {canonical(c).lower(): canonical(c) for c in companies}
+        self.path = path
+        self.enabled = enabled
+        self.entries = {}        # company key -> {"company", "built_at", "research"}
+        self.requested = {}      # company key -> time of the last plan request
+        self._refreshing = {}    # company key -> asyncio.Task
+        self._task = None
+
+    # ----------------- Serving -----------------
+    def note_request(self, company):
+        """Record a plan request; the scheduler only keeps recently requested companies warm."""
+        key = (company or "").lower()
+        if self.enabled and key in self.companies:
+            self.requested[key] = time.time()
+
+    def get(self, company, message=""):
+        """Baseline research dict for `company`, or None when it is not hot, not built or too old.
+
+        Long, specific requests ("... focusing on their healthcare customers") are left to the live path.
+        """
+        key = (company or "").lower()
+        if not self.enabled or key not in self.companies or len(message.split()) > CHATTY_INTENT_WORDS:
+            return None
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        age = time.time() - entry["built_at"]
+        if age > WARM_MAX_STALE:
+            return None
+        if age > WARM_TTL:
+            self.refresh_soon(key)
+        return dict(entry["research"], namespace=namespace_key(WARM_SESSION, entry["company"]),
+                    persona=BASELINE_PERSONA, format=BASELINE_FORMAT, warm=True, age=age)
+
+    # ----------------- Refresh -----------------
+    def refresh_soon(self, key):
+        """Start a background rebuild of one company unless one is already running."""
+        task = self._refreshing.get(key)
+        if task is None or task.done():
+            self._refreshing[key] = asyncio.ensure_future(self.refresh(key))
+
+    async def refresh(self, key):
+        company = self.companies[key]
+        # background work yields to interactive calls at the LLM rate limiter
+        current_priority.set(PRIORITY_BACKGROUND)
+        staging = namespace_key(STAGING_SESSION, company)
+        retriever.evict(staging)
+        try:
+            research = await self.agent.research_company(
+                company, session_id=STAGING_SESSION, persona=BASELINE_PERSONA, out_format=BASELINE_FORMAT
+            )
+        except Exception as e:
+            print("WARM CACHE ERROR:", company, e)
+            return False
+        if research.get("error") or not research.get("parsed"):
+            print("WARM CACHE ERROR:", company, research.get("error") or "no plan")
+            return False
+        # swap the freshly indexed documents in; the old ones served requests until now.
+        # The LRU cap must not drop them while the entry still points at them.
+        target = namespace_key(WARM_SESSION, company)
+        retriever.pin(target)
+        swapped = retriever.clone_namespace(staging, target)
+        retriever.evict(staging)
+        if not swapped:
+            print("WARM CACHE ERROR:", company, "staging documents were evicted")
+            return False
+        self.entries[key] = {
+            "company": company,
+            "built_at": time.time(),
+            "research": {k: research.get(k) for k in ("sources", "docs", "conflicts", "text", "parsed", "summary", "error")},
+        }
+        await asyncio.to_thread(self._save)
+        return True
+
+    async def _schedule(self):
+        while True:
+            now = time.time()
+            for key, requested_at in list(self.requested.items()):
+                if now - requested_at > WARM_RECENT:
+                    continue
+                entry = self.entries.get(key)
+                if entry is None or now - entry["built_at"] > WARM_TTL:
+                    # one company at a time keeps the background load (and rate-limit share) small
+                    self.refresh_soon(key)
+                    await asyncio.gather(self._refreshing[key], return_exceptions=True)
+            await asyncio.sleep(WARM_CHECK_INTERVAL)
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        await asyncio.to_thread(self._load)
+        for entry in self.entries.values():
+            retriever.pin(namespace_key(WARM_SESSION, entry["company"]))
+        self._task = asyncio.create_task(self._schedule())
+
+    async def stop(self):
+        tasks = [t for t in [self._task, *self._refreshing.values()] if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._refreshing = {}
+
+    # ----------------- Persistence -----------------
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print("WARM CACHE ERROR:", e)
+            return
+        self.entries.update({k: v for k, v in entries.items() if k in self.companies})
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except (OSError, TypeError) as e:
+            print("WARM CACHE ERROR:", e)
+
+    def stats(self):
+        now = time.time()
+        return {
+            entry["company"]: {"age": round(now - entry["built_at"]), "fresh": now - entry["built_at"] <= WARM_TTL}
+            for entry in self.entries.values()
+        }
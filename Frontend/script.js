@@ -152,16 +152,7 @@ async function sendMessage() {
     loader.classList.remove("hidden");
 
     try {
-        const response = await fetch("http://127.0.0.1:8000/chat", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-                message,
-                session_id: "default-session"
-            })
-        });
-
-        const data = await response.json();
+        const data = await streamChat(message, "default-session");
         loader.classList.add("hidden");
 
         const formatted = formatBotMessage(data);
@@ -180,6 +171,63 @@ async function sendMessage() {
     }
 }
 
+// ===== STREAMING CHAT (SSE over fetch) =====
+// Shows each progress step in the loader as it happens and resolves with the final result.
+async function streamChat(message, session_id) {
+    const loaderText = document.querySelector("#loader p");
+    const response = await fetch("http://127.0.0.1:8000/chat/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message, session_id })
+    });
+    if (!response.ok || !response.body) throw new Error("stream failed");
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let tokens = 0;
+    let result = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+            const raw = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+
+            let event = "message";
+            let dataLine = "";
+            raw.split("\n").forEach(line => {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) dataLine += line.slice(5).trim();
+            });
+            const payload = dataLine ? JSON.parse(dataLine) : {};
+
+            if (event === "progress" && loaderText) {
+                loaderText.textContent = payload.msg;
+            } else if (event === "token" && loaderText) {
+                tokens += payload.text.length;
+                loaderText.textContent = `Writing plan… ${tokens} characters`;
+            } else if (event === "reset") {
+                // the model stream broke and is being retried from the start
+                tokens = 0;
+                if (loaderText) loaderText.textContent = "Connection hiccup, retrying…";
+            } else if (event === "result") {
+                result = payload;
+            } else if (event === "error") {
+                throw new Error(payload.detail);
+            }
+        }
+    }
+
+    if (loaderText) loaderText.textContent = "Generating plan… please wait";
+    if (!result) throw new Error("stream ended without result");
+    return result;
+}
+
 async function resetSession() {
     await fetch("http://127.0.0.1:8000/reset", {
         method: "POST"